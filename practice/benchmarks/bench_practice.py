@@ -0,0 +1,383 @@
+# Benchmarks for the interview solutions under practice/src.
+#
+# n is the main input size of each module (rows, rates, routes, factories...).
+# Solutions that are quadratic or exponential by design get a max_scale so a
+# large --scales run does not hang on them.
+
+import atexit
+import os
+import random
+import tempfile
+import threading
+
+import generators
+from harness import benchmark
+
+FEE_MODULE = 'transaction_fee/transaction.py'
+
+
+def fee_csv_file(n, seed):
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    atexit.register(os.remove, path)
+    generators.write_fee_csv(path, n, seed)
+    return path
+
+
+@benchmark('fees', FEE_MODULE)
+def bench_fees(mod, n, seed):
+    csv_data = generators.fee_csv(n, seed)
+    schedule = mod.FeeSchedule(generators.COUNTRY_FEES)
+    return lambda: mod.calculate_fees_scheduled(csv_data, schedule)
+
+
+@benchmark('fees_exact', FEE_MODULE)
+def bench_fees_exact(mod, n, seed):
+    csv_data = generators.fee_csv(n, seed)
+    schedule = mod.ExactFeeSchedule(generators.COUNTRY_FEES)
+    return lambda: mod.calculate_fees_scheduled(csv_data, schedule)
+
+
+@benchmark('fees_streaming', FEE_MODULE)
+def bench_fees_streaming(mod, n, seed):
+    # Input on disk and output discarded, so peak memory should stay flat as n grows.
+    path = fee_csv_file(n, seed)
+    schedule = mod.FeeSchedule(generators.COUNTRY_FEES)
+
+    def run():
+        for _ in mod.iter_fees(path, schedule):
+            pass
+    return run
+
+
+def _fees_parallel(workers):
+    # Same file as fees_streaming, output written to /dev/null in whole blocks. Compare the
+    # rows/s across worker counts; speedup needs at least that many free cores. On a single
+    # core the numbers should stay flat, since every row is still parsed only once.
+    def bench(mod, n, seed):
+        path = fee_csv_file(n, seed)
+        schedule = mod.FeeSchedule(generators.COUNTRY_FEES)
+
+        def run():
+            with open(os.devnull, 'w') as out:
+                mod.write_fees_parallel(path, schedule, out, workers=workers)
+        return run
+    return bench
+
+
+for _workers in (1, 2, 4, 8):
+    benchmark(f'fees_parallel_w{_workers}', FEE_MODULE)(_fees_parallel(_workers))
+
+
+@benchmark('fees_columnar', FEE_MODULE)
+def bench_fees_columnar(mod, n, seed):
+    path = fee_csv_file(n, seed)
+    return lambda: mod.calculate_fees_columnar(path, generators.COUNTRY_FEES)
+
+
+@benchmark('fx_direct', 'currency_exchange/foreign_exchange.py', max_scale=10**5)
+def bench_fx_direct(mod, n, seed):
+    # One query per quoted pair; the part 5 converter runs one SPFA per distinct source,
+    # which is O(currencies * rates) overall.
+    rates = generators.fx_rates(n, seed)
+    rate_string = generators.fx_rate_string(n, seed)
+    queries = [(b, a) for a, b, _ in rates]
+
+    def run():
+        converter = mod.CurrencyConverter(rate_string)
+        for from_curr, to_curr in queries:
+            converter.getRate(from_curr, to_curr)
+    return run
+
+
+@benchmark('fx_arbitrage', 'currency_exchange/foreign_exchange.py')
+def bench_fx_arbitrage(mod, n, seed):
+    # A consistent sheet over 200 currencies: the full scan finds nothing.
+    converter = mod.CurrencyConverter(generators.fx_rate_string(n, seed, currencies=200))
+    return converter.find_arbitrage
+
+
+@benchmark('fx_matrix', 'currency_exchange/foreign_exchange.py')
+def bench_fx_matrix(mod, n, seed):
+    # Same workload as fx_direct, answered from the all-pairs matrix built once.
+    rates = generators.fx_rates(n, seed)
+    rate_string = generators.fx_rate_string(n, seed)
+    queries = [(b, a) for a, b, _ in rates]
+
+    def run():
+        converter = mod.MatrixCurrencyConverter(rate_string)
+        for from_curr, to_curr in queries:
+            converter.getRate(from_curr, to_curr)
+    return run
+
+
+@benchmark('fx_matrix_update', 'currency_exchange/foreign_exchange.py', max_scale=10**4)
+def bench_fx_matrix_update(mod, n, seed):
+    # n ticks on 20 spoke currencies quoted only against C0000, on top of a
+    # 200-currency sheet. Each tick is an incremental update, not a rebuild.
+    converter = mod.MatrixCurrencyConverter(generators.fx_rate_string(2000, seed, currencies=200))
+    spokes = [f'S{i:03d}' for i in range(20)]
+    for spoke in spokes:
+        converter.update_rate('C0000', spoke, 1.0)
+    rng = random.Random(seed)
+    ticks = [(spokes[i % 20], rng.uniform(0.9, 1.1)) for i in range(n)]
+
+    def run():
+        for spoke, rate in ticks:
+            converter.update_rate('C0000', spoke, rate)
+    return run
+
+
+def _fx_conversion_converter(mod, seed):
+    # 50 currencies, so at most 2500 distinct pairs however large n gets.
+    return mod.MatrixCurrencyConverter(generators.fx_rate_string(500, seed, currencies=50))
+
+
+@benchmark('fx_convert_loop', 'currency_exchange/foreign_exchange.py')
+def bench_fx_convert_loop(mod, n, seed):
+    converter = _fx_conversion_converter(mod, seed)
+    rows = list(zip(*generators.fx_conversions(n, seed)))
+
+    def run():
+        get_rate = converter.getRate
+        return [round(amount * get_rate(from_curr, to_curr)) for amount, from_curr, to_curr in rows]
+    return run
+
+
+@benchmark('fx_convert_many', 'currency_exchange/foreign_exchange.py')
+def bench_fx_convert_many(mod, n, seed):
+    converter = _fx_conversion_converter(mod, seed)
+    amounts, from_codes, to_codes = generators.fx_conversions(n, seed)
+    return lambda: converter.convert_many(amounts, from_codes, to_codes, minor_units={})
+
+
+@benchmark('fx_feed_reads', 'currency_exchange/foreign_exchange.py')
+def bench_fx_feed_reads(mod, n, seed):
+    # n versioned reads over 4 threads while one writer keeps publishing batches of
+    # 100 ticks. Readers never lock, so the writer only costs them GIL time.
+    codes = generators.currency_codes(200)
+    rng = random.Random(seed)
+    queries = [(rng.choice(codes), 'SPOT') for _ in range(n)]
+    ticks = [('C0000', 'SPOT', rng.uniform(0.9, 1.1)) for _ in range(100)]
+    rate_string = generators.fx_rate_string(2000, seed, currencies=200) + ',C0000:SPOT:1.0'
+
+    def run():
+        converter = mod.StreamingCurrencyConverter(rate_string)
+        done = threading.Event()
+
+        def reader(batch):
+            get_rate_with_version = converter.get_rate_with_version
+            for from_curr, to_curr in batch:
+                get_rate_with_version(from_curr, to_curr)
+
+        def writer():
+            while not done.is_set():
+                converter.apply_rates(ticks, batch_size=100)
+
+        readers = [threading.Thread(target=reader, args=(queries[i::4],)) for i in range(4)]
+        writer_thread = threading.Thread(target=writer)
+        writer_thread.start()
+        for thread in readers:
+            thread.start()
+        for thread in readers:
+            thread.join()
+        done.set()
+        writer_thread.join()
+    return run
+
+
+@benchmark('fx_dfs', 'currency_exchange/foreign_exchange.py', max_scale=24)
+def bench_fx_dfs(mod, n, seed):
+    # Part 4 enumerates every simple path, which is exponential in the graph size.
+    converter_cls = type('Part4Converter', (), {
+        '__init__': mod.__init__, '_parse_rates': mod._parse_rates, 'getRate': mod.getRate,
+    })
+    converter = converter_cls(generators.fx_rate_string(n, seed, currencies=max(2, n // 2)))
+    codes = generators.currency_codes(max(2, n // 2))
+    return lambda: converter.getRate(codes[0], codes[-1])
+
+
+@benchmark('shipping_dijkstra', 'shipping_routes/shipping_routes_1point3acres.py')
+def bench_shipping(mod, n, seed):
+    routes, countries = generators.shipping_routes(n, seed)
+    return lambda: mod.dijkstra(routes, countries[0], countries[-1])
+
+
+@benchmark('shipping_dijkstra_csr', 'shipping_routes/shipping_routes_1point3acres.py')
+def bench_shipping_csr(mod, n, seed):
+    # Same input and query as shipping_dijkstra, parsed into a CSRGraph instead.
+    routes, countries = generators.shipping_routes(n, seed)
+    return lambda: mod.dijkstra_csr(routes, countries[0], countries[-1])
+
+
+# Graph representation: n edges stored as dict-of-lists vs CSR arrays. *_graph_*
+# times the build (peak / n is bytes per edge); *_search_* runs one full search
+# over a graph built outside the timed run.
+
+@benchmark('shipping_graph_dict', 'shipping_routes/shipping_routes_1point3acres.py')
+def bench_shipping_graph_dict(mod, n, seed):
+    routes, _ = generators.shipping_routes(n, seed)
+    return lambda: mod.parse_input(routes)
+
+
+@benchmark('shipping_graph_csr', 'shipping_routes/shipping_routes_1point3acres.py')
+def bench_shipping_graph_csr(mod, n, seed):
+    routes, _ = generators.shipping_routes(n, seed)
+    return lambda: mod.parse_input_csr(routes)
+
+
+@benchmark('shipping_search_csr', 'shipping_routes/shipping_routes_1point3acres.py')
+def bench_shipping_search_csr(mod, n, seed):
+    routes, countries = generators.shipping_routes(n, seed)
+    graph = mod.parse_input_csr(routes)
+    return lambda: mod.dijkstra_csr(graph, countries[0], countries[-1])
+
+
+def _fx_graph(class_name):
+    def bench(mod, n, seed):
+        # n / 2 quotes, stored in both directions.
+        rate_string = generators.fx_rate_string(max(1, n // 2), seed)
+        return lambda: getattr(mod, class_name)(rate_string)
+    return bench
+
+
+def _fx_search(class_name):
+    def bench(mod, n, seed):
+        converter = getattr(mod, class_name)(generators.fx_rate_string(max(1, n // 2), seed))
+        source = generators.currency_codes(1)[0]
+        return lambda: converter._relax([source])
+    return bench
+
+
+benchmark('fx_graph_dict', 'currency_exchange/foreign_exchange.py')(_fx_graph('CurrencyConverter'))
+benchmark('fx_graph_csr', 'currency_exchange/foreign_exchange.py')(_fx_graph('CSRCurrencyConverter'))
+benchmark('fx_search_dict', 'currency_exchange/foreign_exchange.py')(_fx_search('CurrencyConverter'))
+benchmark('fx_search_csr', 'currency_exchange/foreign_exchange.py')(_fx_search('CSRCurrencyConverter'))
+
+
+@benchmark('factory_no_distance', 'factory_cost/factory_cost.py')
+def bench_factory_no_distance(mod, n, seed):
+    factories = generators.factory_options(n, seed)
+    return lambda: mod.min_cost_no_distance(factories)
+
+
+@benchmark('factory_skip_one_dp', 'factory_cost/factory_cost.py', max_scale=10**6)
+def bench_factory_skip_one(mod, n, seed):
+    factories = generators.factory_options(n, seed, max_distance=20)
+    return lambda: mod.min_cost_skip_one_optimal(factories)
+
+
+@benchmark('kyc', 'KYC/KYC.py')
+def bench_kyc(mod, n, seed):
+    csv_data = generators.kyc_csv(n, seed)
+    return lambda: mod.validate_businesses(csv_data)
+
+
+@benchmark('invoices', 'payment_invoices/payment_invoices.py')
+def bench_invoices(mod, n, seed):
+    # Loads the invoice lines through MappedCSV, then one sort for the amount fallback.
+    payment, invoice_lines = generators.invoices(n, seed)
+    return lambda: mod.reconcile_payment(payment, invoice_lines, 5)
+
+
+@benchmark('fraud_rules', 'Fraud Detection/fraud.py')
+def bench_fraud(mod, n, seed):
+    transactions, rules = generators.fraud_inputs(n, seed)
+    return lambda: mod.get_output_with_rules(transactions, rules)
+
+
+@benchmark('rbac', 'RBAC/rbac_role_resolver.py')
+def bench_rbac(mod, n, seed):
+    # n assignments over n / 10 accounts, followed by n role lookups.
+    accounts, assignments = generators.rbac_tree(max(1, n // 10), n, seed)
+    rng = random.Random(seed)
+    queries = [(a["userId"], rng.choice(accounts)["accountId"]) for a in assignments]
+
+    def run():
+        resolver = mod.RBACRoleResolver(accounts, assignments)
+        for user_id, account_id in queries:
+            resolver.getUserRoles(user_id, account_id)
+    return run
+
+
+def _rbac_checks(class_name):
+    # Role lookups only, against a resolver built outside the timed run.
+    def bench(mod, n, seed):
+        accounts, assignments = generators.rbac_tree(max(1, n // 10), n, seed)
+        rng = random.Random(seed)
+        queries = [(a["userId"], rng.choice(accounts)["accountId"]) for a in assignments]
+        resolver = getattr(mod, class_name)(accounts, assignments)
+
+        def run():
+            for user_id, account_id in queries:
+                resolver.getUserRoles(user_id, account_id)
+        return run
+    return bench
+
+
+benchmark('rbac_checks', 'RBAC/rbac_role_resolver.py')(_rbac_checks('RBACRoleResolver'))
+benchmark('rbac_checks_indexed', 'RBAC/rbac_role_resolver.py')(_rbac_checks('IndexedRBACRoleResolver'))
+
+
+def _rbac_repeated_checks(class_name):
+    # n role lookups drawn from n / 100 distinct (user, account) pairs, with one
+    # assignment added every 1000 lookups so cached answers keep getting invalidated.
+    def bench(mod, n, seed):
+        accounts, assignments = generators.rbac_tree(max(1, n // 10), max(1, n // 10), seed)
+        rng = random.Random(seed)
+        hot = [(rng.choice(assignments)["userId"], rng.choice(accounts)["accountId"])
+               for _ in range(max(1, n // 100))]
+        queries = [rng.choice(hot) for _ in range(n)]
+
+        def run():
+            resolver = getattr(mod, class_name)(accounts, assignments)
+            for i, (user_id, account_id) in enumerate(queries):
+                if i % 1000 == 999:
+                    resolver.addRoleAssignment(user_id, account_id, 'auditor')
+                resolver.getUserRoles(user_id, account_id)
+        return run
+    return bench
+
+
+benchmark('rbac_repeated', 'RBAC/rbac_role_resolver.py')(_rbac_repeated_checks('RBACRoleResolver'))
+benchmark('rbac_repeated_cached', 'RBAC/rbac_role_resolver.py')(_rbac_repeated_checks('CachedRBACRoleResolver'))
+
+
+@benchmark('rbac_cold_start', 'RBAC/rbac_role_resolver.py')
+def bench_rbac_cold_start(mod, n, seed):
+    # Construction only: n assignments over n / 10 accounts.
+    accounts, assignments = generators.rbac_tree(max(1, n // 10), n, seed)
+    return lambda: mod.RBACRoleResolver(accounts, assignments)
+
+
+@benchmark('rbac_snapshot_load', 'RBAC/rbac_role_resolver.py')
+def bench_rbac_snapshot_load(mod, n, seed):
+    accounts, assignments = generators.rbac_tree(max(1, n // 10), n, seed)
+    fd, path = tempfile.mkstemp(suffix='.rbac')
+    os.close(fd)
+    atexit.register(os.remove, path)
+    mod.RBACRoleResolver(accounts, assignments).save_snapshot(path)
+    return lambda: mod.RBACRoleResolver.load_snapshot(path)
+
+
+@benchmark('rbac_filter', 'RBAC/rbac_role_resolver.py')
+def bench_rbac_filter(mod, n, seed):
+    # n users inherited by the deepest account of an 8-level chain; one filtered
+    # query per role pair, against a resolver built outside the timed run.
+    accounts, assignments = generators.rbac_inherited_users(n, seed=seed)
+    resolver = mod.RBACRoleResolver(accounts, assignments)
+    leaf = accounts[-1]["accountId"]
+    filters = [['admin'], ['editor', 'viewer'], ['billing', 'developer'], ['admin', 'billing']]
+
+    def run():
+        for role_filter in filters:
+            resolver.getUsersForAccountWithFilter(leaf, role_filter)
+    return run
+
+
+@benchmark('user_linking', 'user_linked/user_linked.py', max_scale=3000)
+def bench_user_linking(mod, n, seed):
+    # Every pair of rows is compared, so this is O(n^2).
+    rows, weights, threshold = generators.user_linking_rows(n, seed)
+    return lambda: mod.solve_user_linking(rows, weights, threshold, 0)
+
@@ -0,0 +1,153 @@
+# Rate limiter benchmarks.
+#
+# limiter_ops_*: n requests spread over 1000 keys at ~100 requests per time unit,
+#   50 requests per 10 units allowed. Throughput is check_and_hit calls per second.
+# limiter_batch_*: the same requests through check_and_hit_many in batches of 4096.
+# limiter_late_*: late-arriving events on one hot key. Timestamps are shuffled back
+#   by up to 1000 units, with no request limit and a 2000 unit window, so the key
+#   holds up to ~200k timestamps and most inserts land in the middle of its window.
+# limiter_metrics_*: limiter_ops_deque with metrics off (metrics=None, the default)
+#   and on. "off" should match limiter_ops_deque; "on" shows the instrumentation cost.
+# limiter_mem_*: n keys, each hit 50 times inside one window with room for 100.
+#   peak / n is roughly the bytes of limiter state per key.
+
+import random
+import threading
+
+import generators
+from harness import benchmark
+
+LIMITER_MODULE = 'rate_limiter/rate_limiter.py'
+
+LIMITERS = {
+    'deque': 'ThreadSafeRateLimiter',
+    'robust': 'RobustRateLimiter',
+    'token_bucket': 'TokenBucketRateLimiter',
+    'gcra': 'GCRARateLimiter',
+    'window_counter': 'SlidingWindowCounterRateLimiter',
+}
+
+
+def _ops_benchmark(class_name):
+    def bench(mod, n, seed):
+        limiter_cls = getattr(mod, class_name)
+        requests = generators.rate_limiter_requests(n, seed)
+
+        def run():
+            limiter = limiter_cls(max_requests=50, window_seconds=10)
+            check_and_hit = limiter.check_and_hit
+            for key, timestamp in requests:
+                check_and_hit(key, timestamp)
+        return run
+    return bench
+
+
+def _batch_benchmark(make_limiter, batch_size=4096):
+    def bench(mod, n, seed):
+        requests = generators.rate_limiter_requests(n, seed)
+        batches = [requests[i:i + batch_size] for i in range(0, n, batch_size)]
+
+        def run():
+            limiter = make_limiter(mod)
+            for batch in batches:
+                limiter.check_and_hit_many(batch)
+        return run
+    return bench
+
+
+def _late_benchmark(class_name):
+    def bench(mod, n, seed):
+        limiter_cls = getattr(mod, class_name)
+        requests = generators.rate_limiter_requests(n, seed, keys=1, shuffle_window=1000)
+
+        def run():
+            limiter = limiter_cls(max_requests=n, window_seconds=2000)
+            check_and_hit = limiter.check_and_hit
+            for key, timestamp in requests:
+                check_and_hit(key, timestamp)
+        return run
+    return bench
+
+
+def _metrics_benchmark(enabled):
+    def bench(mod, n, seed):
+        requests = generators.rate_limiter_requests(n, seed)
+
+        def run():
+            metrics = mod.LimiterMetrics() if enabled else None
+            limiter = mod.ThreadSafeRateLimiter(max_requests=50, window_seconds=10, metrics=metrics)
+            check_and_hit = limiter.check_and_hit
+            for key, timestamp in requests:
+                check_and_hit(key, timestamp)
+        return run
+    return bench
+
+
+def _memory_benchmark(class_name, hits_per_key=50):
+    def bench(mod, n, seed):
+        limiter_cls = getattr(mod, class_name)
+        keys = [f'key_{i}' for i in range(n)]
+        random.Random(seed).shuffle(keys)
+
+        def run():
+            limiter = limiter_cls(max_requests=100, window_seconds=1000)
+            for timestamp in range(hits_per_key):
+                for key in keys:
+                    limiter.check_and_hit(key, timestamp)
+            return limiter
+        return run
+    return bench
+
+
+for short_name, class_name in LIMITERS.items():
+    benchmark(f'limiter_ops_{short_name}', LIMITER_MODULE)(_ops_benchmark(class_name))
+    benchmark(f'limiter_batch_{short_name}', LIMITER_MODULE)(_batch_benchmark(
+        lambda mod, class_name=class_name: getattr(mod, class_name)(max_requests=50, window_seconds=10)))
+    benchmark(f'limiter_mem_{short_name}', LIMITER_MODULE, max_scale=10**6)(_memory_benchmark(class_name))
+benchmark('limiter_late_robust', LIMITER_MODULE, max_scale=10**6)(_late_benchmark('RobustRateLimiter'))
+benchmark('limiter_late_out_of_order', LIMITER_MODULE)(_late_benchmark('OutOfOrderRateLimiter'))
+benchmark('limiter_metrics_off', LIMITER_MODULE)(_metrics_benchmark(False))
+benchmark('limiter_metrics_on', LIMITER_MODULE)(_metrics_benchmark(True))
+benchmark('limiter_batch_sharded', LIMITER_MODULE)(_batch_benchmark(
+    lambda mod: mod.ShardedRateLimiter(max_requests=50, window_seconds=10)))
+
+
+# Contention: n requests split over 8 threads. With one shard every request
+# serializes on the same lock; more shards spread them out.
+# limiter_threads_sharded_16_metrics is sharded_16 with metrics on: recording
+# must not add a lock that every thread shares again.
+THREADS = 8
+
+
+def _threaded_benchmark(make_limiter):
+    def bench(mod, n, seed):
+        requests = generators.rate_limiter_requests(n, seed, keys=10_000)
+        per_thread = [requests[i::THREADS] for i in range(THREADS)]
+
+        def run():
+            limiter = make_limiter(mod)
+            barrier = threading.Barrier(THREADS)
+
+            def worker(batch):
+                check_and_hit = limiter.check_and_hit
+                barrier.wait()
+                for key, timestamp in batch:
+                    check_and_hit(key, timestamp)
+
+            threads = [threading.Thread(target=worker, args=(batch,)) for batch in per_thread]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return run
+    return bench
+
+
+benchmark('limiter_threads_global_lock', LIMITER_MODULE)(
+    _threaded_benchmark(lambda mod: mod.ThreadSafeRateLimiter(max_requests=50, window_seconds=10)))
+for shards in (1, 4, 16, 64):
+    benchmark(f'limiter_threads_sharded_{shards}', LIMITER_MODULE)(_threaded_benchmark(
+        lambda mod, shards=shards: mod.ShardedRateLimiter(max_requests=50, window_seconds=10, num_shards=shards)))
+benchmark('limiter_threads_sharded_16_metrics', LIMITER_MODULE)(_threaded_benchmark(
+    lambda mod: mod.ShardedRateLimiter(max_requests=50, window_seconds=10, num_shards=16,
+                                       metrics=mod.LimiterMetrics())))
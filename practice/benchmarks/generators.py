@@ -0,0 +1,210 @@
+# Seeded input generators for the practice modules.
+#
+# Every generator takes a size and a seed and returns input in the exact
+# format the matching module parses, so the same (n, seed) always produces
+# the same data.
+
+import random
+
+FEE_HEADER = 'id,reference,amount,currency,date,merchant_id,buyer_country,transaction_type,payment_provider,status'
+FEE_COUNTRIES = ['ie', 'de', 'fr', 'us', 'gb', 'es']
+FEE_PROVIDERS = ['card', 'klarna', 'bank_transfer']
+FEE_STATUSES = ['payment_completed'] * 8 + ['payment_failed', 'payment_pending']
+
+COUNTRY_FEES = {
+    "ie": {"card": (0.019, 20), "klarna": (0.025, 40), "bank_transfer": (0.006, 0)},
+    "de": {"card": (0.025, 25), "klarna": (0.030, 45), "bank_transfer": (0.007, 0)},
+    "fr": {"card": (0.027, 28), "klarna": (0.032, 48), "bank_transfer": (0.008, 0)},
+    "default": {"card": (0.029, 30), "klarna": (0.035, 50), "bank_transfer": (0.008, 0)}
+}
+
+WORDS = ['land', 'water', 'acme', 'global', 'trading', 'maple', 'ridge', 'bakery', 'innovation',
+         'labs', 'river', 'stone', 'north', 'blue', 'harbor', 'summit', 'cedar', 'bright', 'craft']
+
+
+def currency_codes(count):
+    return [f'C{i:04d}' for i in range(count)]
+
+
+def fee_rows(n, seed=0, merchants=1000):
+    """Yield n transaction rows (without the header) for transaction_fee."""
+    rng = random.Random(seed)
+    for i in range(n):
+        yield (
+            f'py_{i},{i},{rng.randrange(100, 500_000)},eur,'
+            f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d},'
+            f'acct_{rng.randrange(merchants)},{rng.choice(FEE_COUNTRIES)},payment,'
+            f'{rng.choice(FEE_PROVIDERS)},{rng.choice(FEE_STATUSES)}'
+        )
+
+
+def fee_csv(n, seed=0, merchants=1000):
+    return '\n'.join([FEE_HEADER, *fee_rows(n, seed, merchants)])
+
+
+def write_fee_csv(path, n, seed=0, merchants=1000):
+    with open(path, 'w') as f:
+        f.write(FEE_HEADER + '\n')
+        for row in fee_rows(n, seed, merchants):
+            f.write(row + '\n')
+
+
+def fx_rates(n_rates, seed=0, currencies=None, noise=0.0):
+    """Return [(from, to, rate)]. Rates come from one value per currency, so there is no arbitrage unless noise > 0."""
+    rng = random.Random(seed)
+    currencies = currencies or max(2, int(n_rates ** 0.5) * 2)
+    codes = currency_codes(currencies)
+    value = {code: rng.uniform(0.01, 100.0) for code in codes}
+
+    # A chain first so every currency is reachable, then random extra edges.
+    rates = []
+    for a, b in zip(codes, codes[1:]):
+        rates.append((a, b, value[a] / value[b]))
+    while len(rates) < n_rates:
+        a, b = rng.sample(codes, 2)
+        rate = value[a] / value[b]
+        if noise:
+            rate *= 1 + rng.uniform(-noise, noise)
+        rates.append((a, b, rate))
+    return rates[:n_rates]
+
+
+def fx_rate_string(n_rates, seed=0, currencies=None, noise=0.0):
+    """CurrencyConverter input: "FROM:TO:RATE,FROM:TO:RATE,..."."""
+    return ','.join(f'{a}:{b}:{rate:.10g}' for a, b, rate in fx_rates(n_rates, seed, currencies, noise))
+
+
+def fx_conversions(n, seed=0, currencies=50):
+    """Return (amounts in minor units, from codes, to codes) for convert_many."""
+    rng = random.Random(seed)
+    codes = currency_codes(currencies)
+    amounts = [rng.randrange(100, 10_000_000) for _ in range(n)]
+    return amounts, [rng.choice(codes) for _ in range(n)], [rng.choice(codes) for _ in range(n)]
+
+
+def shipping_routes(n_routes, seed=0, countries=None):
+    """shipping_routes input: "SRC:DST:METHOD:COST,..."."""
+    rng = random.Random(seed)
+    countries = countries or max(2, n_routes // 5)
+    names = [f'K{i:05d}' for i in range(countries)]
+    methods = ['UPS', 'DHL', 'FedEx', 'USPS']
+    routes = [f'{a}:{b}:{rng.choice(methods)}:{rng.randint(1, 50)}' for a, b in zip(names, names[1:])]
+    while len(routes) < n_routes:
+        a, b = rng.sample(names, 2)
+        routes.append(f'{a}:{b}:{rng.choice(methods)}:{rng.randint(1, 50)}')
+    return ','.join(routes[:n_routes]), names
+
+
+def factory_options(n_factories, seed=0, options=3, max_distance=0):
+    """factory_cost input: one [[cost, distance], ...] list per factory."""
+    rng = random.Random(seed)
+    return [
+        [[rng.randint(1, 100), rng.randint(0, max_distance)] for _ in range(options)]
+        for _ in range(n_factories)
+    ]
+
+
+def kyc_csv(n, seed=0):
+    """KYC input with roughly a third of the rows failing one of the checks."""
+    rng = random.Random(seed)
+    rows = ['col1,col2,col3,col4,col5,col6']
+    for i in range(n):
+        name = ' '.join(rng.sample(WORDS, rng.randint(1, 3)))
+        short = rng.choice(name.split())
+        full = f'{name.upper()} LLC' if rng.random() < 0.7 else rng.choice(['XYZ ENTERPRISES', 'ONLINE STORE', 'ab'])
+        rows.append(f'BIZ{i:07d},{name},{name.replace(" ", "")}.com,{short},{full},Services')
+    return '\n'.join(rows)
+
+
+def invoices(n, seed=0):
+    """payment_invoices input: (payment, invoices). Only the latest invoice matches by amount."""
+    rng = random.Random(seed)
+    lines = [
+        f'inv-{i:07d}, 2024-{rng.randint(1, 11):02d}-{rng.randint(1, 28):02d}, {rng.randint(1000, 9000)}'
+        for i in range(n - 1)
+    ]
+    lines.append(f'inv-{n:07d}, 2024-12-31, 42')
+    return 'payment-001, 42, Customer payment', lines
+
+
+def fraud_inputs(n, seed=0, rules=None):
+    """Fraud Detection input: (transactions, rules) as newline separated strings."""
+    rng = random.Random(seed)
+    merchants = [f'merchant_{i}' for i in range(max(1, n // 100))]
+    cards = [f'4242{rng.randrange(10**12):012d}' for _ in range(max(1, n // 10))]
+    transactions = '\n'.join(
+        f'{rng.randrange(n * 10)},R{i},{rng.randint(1, 100000) / 100:.2f},{rng.choice(cards)},{rng.choice(merchants)}'
+        for i in range(n)
+    )
+    rules = rules or max(1, n // 100)
+    rule_lines = '\n'.join(
+        f'{rng.randrange(n * 10)},merchant,{rng.choice(merchants)}' if rng.random() < 0.5
+        else f'{rng.randrange(n * 10)},card_number,{rng.choice(cards)}'
+        for _ in range(rules)
+    )
+    return transactions, rule_lines
+
+
+def rbac_tree(n_accounts, n_assignments, seed=0, fanout=4, users=None, roles=None):
+    """RBAC input: (accounts, user_role_assignments) for a random tree of accounts."""
+    rng = random.Random(seed)
+    accounts = [{"accountId": "acct_0", "parent": None}]
+    for i in range(1, n_accounts):
+        # Parents are picked near the front so the tree has depth ~log_fanout(n).
+        parent = rng.randrange(max(1, i // fanout + 1))
+        accounts.append({"accountId": f"acct_{i}", "parent": f"acct_{parent}"})
+    rng.shuffle(accounts)
+
+    users = users or max(1, n_assignments // 4)
+    roles = roles or ['admin', 'editor', 'viewer', 'billing', 'developer']
+    assignments = [
+        {"userId": f"usr_{rng.randrange(users)}", "accountId": f"acct_{rng.randrange(n_accounts)}",
+         "role": rng.choice(roles)}
+        for _ in range(n_assignments)
+    ]
+    return accounts, assignments
+
+
+def rbac_inherited_users(n_users, depth=8, seed=0, roles=None):
+    """RBAC input where n_users are assigned along one chain of `depth` accounts.
+
+    Every user inherits access to the deepest account, acct_{depth - 1}, which is
+    the account to query.
+    """
+    rng = random.Random(seed)
+    accounts = [{"accountId": f"acct_{i}", "parent": f"acct_{i - 1}" if i else None} for i in range(depth)]
+    roles = roles or ['admin', 'editor', 'viewer', 'billing', 'developer']
+    assignments = []
+    for user in range(n_users):
+        for role in rng.sample(roles, rng.randint(1, 2)):
+            assignments.append({"userId": f"usr_{user}", "accountId": f"acct_{rng.randrange(depth)}", "role": role})
+    return accounts, assignments
+
+
+def user_linking_rows(n, seed=0):
+    """user_linked input: (rows, weights, threshold)."""
+    rng = random.Random(seed)
+    names = [f'name_{i}' for i in range(max(1, n // 3))]
+    emails = [f'user{i}@example.com' for i in range(max(1, n // 2))]
+    companies = [f'company_{i}' for i in range(max(1, n // 20))]
+    rows = [
+        {"id": i, "name": rng.choice(names), "email": rng.choice(emails), "company": rng.choice(companies)}
+        for i in range(n)
+    ]
+    return rows, {"name": 0.2, "email": 0.5, "company": 0.3}, 0.5
+
+
+def rate_limiter_requests(n, seed=0, keys=1000, rate=100, shuffle_window=0):
+    """Return [(key, timestamp)] with about `rate` requests per time unit.
+
+    shuffle_window > 0 moves each timestamp back by up to that much, for
+    limiters that accept out-of-order events.
+    """
+    rng = random.Random(seed)
+    requests = []
+    for i in range(n):
+        timestamp = i // rate
+        if shuffle_window:
+            timestamp = max(0, timestamp - rng.randrange(shuffle_window + 1))
+        requests.append((f'key_{rng.randrange(keys)}', timestamp))
+    return requests
@@ -0,0 +1,123 @@
+# Small benchmark harness for the practice modules.
+#
+# The solutions under practice/src are plain scripts (directory names with
+# spaces, demo code at import time), so they are loaded by file path with
+# their stdout swallowed. Each benchmark is registered with @benchmark and
+# receives the loaded module, the scale n and a seed. It generates its input
+# up front and returns a zero-argument callable that does the measured work.
+#
+# For every scale we report wall time, throughput (n / seconds), peak Python
+# memory from tracemalloc and that peak divided by n. The memory pass is a
+# second run, so tracemalloc overhead does not show up in the timings.
+
+import argparse
+import contextlib
+import gc
+import importlib.util
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+# The modules import shared helpers such as mmap_csv from practice/src by name.
+if SRC_DIR not in sys.path:
+    sys.path.append(SRC_DIR)
+DEFAULT_SCALES = '1e3,1e4,1e5'
+
+BENCHMARKS = {}
+_modules = {}
+
+
+def benchmark(name, module, max_scale=10**7):
+    """Register fn(mod, n, seed) -> run() under name. Scales above max_scale are skipped."""
+    def register(fn):
+        BENCHMARKS[name] = (module, max_scale, fn)
+        return fn
+    return register
+
+
+def load_module(relpath):
+    """Import practice/src/<relpath> by path, hiding the demo output it prints."""
+    if relpath not in _modules:
+        path = os.path.join(SRC_DIR, relpath)
+        name = 'bench_' + os.path.splitext(relpath)[0].replace(os.sep, '_').replace(' ', '_')
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        with contextlib.redirect_stdout(io.StringIO()):
+            spec.loader.exec_module(module)
+        _modules[relpath] = module
+    return _modules[relpath]
+
+
+def measure(run, trace_memory=True):
+    """Return (seconds, peak_bytes) for one call of run()."""
+    gc.collect()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+
+    peak = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return elapsed, peak
+
+
+def run_benchmark(name, scales, seed=0, trace_memory=True):
+    module_path, max_scale, fn = BENCHMARKS[name]
+    try:
+        module = load_module(module_path)
+    except Exception as exc:
+        print(f'{name:<28} skipped: {module_path} failed to import ({exc!r})')
+        return []
+
+    results = []
+    for n in scales:
+        if n > max_scale:
+            print(f'{name:<28} {n:>10,} skipped (max scale {max_scale:,})')
+            continue
+        run = fn(module, n, seed)
+        elapsed, peak = measure(run, trace_memory)
+        peak_mib = f'{peak / 2**20:10.1f}' if peak is not None else '         -'
+        per_item = f'{peak / n:10.0f}' if peak is not None else '         -'
+        print(f'{name:<28} {n:>10,} {elapsed:10.3f}s {n / elapsed:14,.0f}/s {peak_mib} MiB {per_item} B/item')
+        results.append((name, n, elapsed, peak))
+    return results
+
+
+def parse_scales(text):
+    return [int(float(scale)) for scale in text.split(',') if scale]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the practice modules.')
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help=f'comma separated input sizes, e.g. 1e3,1e5,1e7 (default {DEFAULT_SCALES})')
+    parser.add_argument('--only', default='', help='comma separated benchmark names or prefixes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--list', action='store_true', help='list benchmarks and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (module_path, max_scale, _) in BENCHMARKS.items():
+            print(f'{name:<28} {module_path}  (max scale {max_scale:,})')
+        return
+
+    prefixes = [prefix for prefix in args.only.split(',') if prefix]
+    names = [name for name in BENCHMARKS if not prefixes or any(name.startswith(p) for p in prefixes)]
+    scales = parse_scales(args.scales)
+
+    print(f'{"benchmark":<28} {"n":>10} {"time":>11} {"throughput":>16} {"peak":>14} {"peak / n":>17}')
+    for name in names:
+        run_benchmark(name, scales, args.seed, not args.no_memory)
@@ -0,0 +1,25 @@
+# Run the practice benchmarks.
+#
+#   python practice/benchmarks/run.py                      # every benchmark at 1e3, 1e4, 1e5
+#   python practice/benchmarks/run.py --scales 1e3,1e5,1e7 --only fees
+#   python practice/benchmarks/run.py --list
+#
+# Every bench_*.py file next to this one registers its benchmarks on import.
+
+import glob
+import importlib
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import harness
+
+for path in sorted(glob.glob(os.path.join(HERE, 'bench_*.py'))):
+    importlib.import_module(os.path.splitext(os.path.basename(path))[0])
+
+
+if __name__ == '__main__':
+    harness.main()
@@ -1,24 +1,145 @@
-from collections import defaultdict
+import gc
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+SNAPSHOT_MAGIC = b"RBAC"
+SNAPSHOT_VERSION = 1
+# magic, version, string count, string bytes, parent links, assignments
+SNAPSHOT_HEADER = struct.Struct("<4sIIQQQ")
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Disable the cyclic GC for the block. On exit, even on error, it is re-enabled
+    only if it was enabled on entry, so a caller that already disabled it keeps it off.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
 
 
 class RBACRoleResolver:
     def __init__(self, accounts: list[dict], user_role_assignments: list[dict]):
-        # Map account to parent
-        ### IGnore for first question. Its not serial.
-        self.parent_map = {}
-        for account in accounts:
-            self.parent_map[account["accountId"]] = account["parent"]
-
-        # Map: (userId, accountId) -> set of roles
-        self.role_map = defaultdict(set)
-        for assignment in user_role_assignments:
-            key = (assignment["userId"], assignment["accountId"])
-            self.role_map[key].add(assignment["role"])
-
-        # Index: accountId -> set of userIds
-        self.users_by_account = defaultdict(set)
-        for assignment in user_role_assignments:
-            self.users_by_account[assignment["accountId"]].add(assignment["userId"])
+        self._bulk_load(
+            ((account["accountId"], account["parent"]) for account in accounts),
+            ((a["userId"], a["accountId"], a["role"]) for a in user_role_assignments),
+        )
+
+    def _bulk_load(self, parents, triples):
+        """
+        Build every index in one pass over each input.
+        parents: (accountId, parentId or None) pairs, in any order; a parent does not
+            need to appear before its children since links are only followed at query time.
+        triples: (userId, accountId, role).
+        Replaces any existing state. Subclasses extend _build_indexes.
+        """
+        # Millions of new sets and tuples would trigger repeated full GC passes that
+        # find nothing to free; pause the collector while building.
+        with _gc_paused():
+            self._build_indexes(parents, triples)
+
+    def _build_indexes(self, parents, triples):
+        # Map account to parent, and to children for changes that affect a whole subtree
+        self.parent_map = parent_map = {}
+        self.children = children = defaultdict(list)
+        for account_id, parent_id in parents:
+            parent_map[account_id] = parent_id
+            if parent_id is not None:
+                children[parent_id].append(account_id)
+
+        # (userId, accountId) -> roles, accountId -> userIds, (accountId, role) -> userIds
+        self.role_map = role_map = defaultdict(set)
+        self.users_by_account = users_by_account = defaultdict(set)
+        self.users_by_role = users_by_role = defaultdict(set)
+        for user_id, account_id, role in triples:
+            role_map[(user_id, account_id)].add(role)
+            users_by_account[account_id].add(user_id)
+            users_by_role[(account_id, role)].add(user_id)
+
+    def save_snapshot(self, path: str):
+        """
+        Write the hierarchy and assignments as a compact binary file.
+        Every id is interned once into a NUL-separated string table; parent links
+        and assignments are little-endian int32 arrays of string indices (-1 = no parent).
+        """
+        index = {}
+
+        def intern(value: str) -> int:
+            position = index.get(value)
+            if position is None:
+                if "\0" in value:
+                    raise ValueError(f"Ids may not contain NUL: {value!r}")
+                position = index[value] = len(index)
+            return position
+
+        links = array("i")
+        for account_id, parent_id in self.parent_map.items():
+            links.append(intern(account_id))
+            links.append(-1 if parent_id is None else intern(parent_id))
+
+        assignments = array("i")
+        for (user_id, account_id), roles in self.role_map.items():
+            for role in roles:
+                assignments.append(intern(user_id))
+                assignments.append(intern(account_id))
+                assignments.append(intern(role))
+
+        strings = "\0".join(index).encode()
+        if sys.byteorder == "big":
+            links.byteswap()
+            assignments.byteswap()
+        with open(path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(index), len(strings),
+                                         len(links) // 2, len(assignments) // 3))
+            f.write(strings)
+            links.tofile(f)
+            assignments.tofile(f)
+
+    @classmethod
+    def load_snapshot(cls, path: str, **kwargs):
+        """Build a resolver (of this class; kwargs go to its constructor) from save_snapshot output."""
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < SNAPSHOT_HEADER.size:
+            raise ValueError(f"{path} is not an RBAC snapshot (version {SNAPSHOT_VERSION})")
+        magic, version, n_strings, n_bytes, n_links, n_assignments = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not an RBAC snapshot (version {SNAPSHOT_VERSION})")
+        if len(data) != SNAPSHOT_HEADER.size + n_bytes + n_links * 8 + n_assignments * 12:
+            raise ValueError(f"{path} is truncated or corrupt")
+
+        offset = SNAPSHOT_HEADER.size
+        names = data[offset:offset + n_bytes].decode().split("\0") if n_strings else []
+        offset += n_bytes
+        links = array("i")
+        links.frombytes(data[offset:offset + n_links * 8])
+        offset += n_links * 8
+        assignments = array("i")
+        assignments.frombytes(data[offset:offset + n_assignments * 12])
+        if sys.byteorder == "big":
+            links.byteswap()
+            assignments.byteswap()
+        if len(names) != n_strings:
+            raise ValueError(f"{path} is truncated or corrupt")
+
+        names.append(None)  # index -1 -> no parent
+        resolver = cls([], [], **kwargs)
+        resolver._bulk_load(
+            zip(map(names.__getitem__, links[0::2]), map(names.__getitem__, links[1::2])),
+            zip(map(names.__getitem__, assignments[0::3]), map(names.__getitem__, assignments[1::3]),
+                map(names.__getitem__, assignments[2::3])),
+        )
+        return resolver
 
     def _getAncestors(self, accountId: str) -> list[str]:
         """Helper: Get account and all parents."""
@@ -29,6 +150,13 @@ class RBACRoleResolver:
             current = self.parent_map.get(current)
         return ancestors
 
+    def _getDescendants(self, accountId: str) -> list[str]:
+        """Helper: Get account and everything below it."""
+        descendants = [accountId]
+        for account_id in descendants:
+            descendants.extend(self.children.get(account_id, ()))
+        return descendants
+
     def getUserRoles(self, userId: str, accountId: str) -> list[str]:
         """Get all roles including inherited ones."""
         roles = set()
@@ -47,22 +175,237 @@ class RBACRoleResolver:
 
     def getUsersForAccountWithFilter(self, accountId: str, roleFilters: list[str]) -> list[str]:
         """Get users who have all specified roles."""
-        all_users = self.getUsersForAccount(accountId)
-
         if not roleFilters:
-            return all_users
-
-        required_roles = set(roleFilters)
-        return [
-            user_id for user_id in all_users
-            if required_roles.issubset(set(self.getUserRoles(user_id, accountId)))
-        ]
+            return self.getUsersForAccount(accountId)
+
+        # One ancestor walk; per role, the users holding it anywhere on the chain,
+        # then intersect across roles instead of re-resolving every user.
+        ancestors = self._getAncestors(accountId)
+        result = None
+        for role in set(roleFilters):
+            holders = set()
+            for ancestor in ancestors:
+                holders.update(self.users_by_role.get((ancestor, role), ()))
+            result = holders if result is None else result & holders
+            if not result:
+                break
+        return list(result)
 
     def addRoleAssignment(self, userId: str, accountId: str, role: str):
         """Add a role assignment dynamically."""
         key = (userId, accountId)
         self.role_map[key].add(role)
         self.users_by_account[accountId].add(userId)
+        self.users_by_role[(accountId, role)].add(userId)
+
+    def removeRoleAssignment(self, userId: str, accountId: str, role: str):
+        """Remove a role assignment; missing assignments are ignored."""
+        key = (userId, accountId)
+        roles = self.role_map.get(key)
+        if not roles or role not in roles:
+            return
+        roles.discard(role)
+        if not roles:
+            del self.role_map[key]
+            self.users_by_account[accountId].discard(userId)
+            if not self.users_by_account[accountId]:
+                del self.users_by_account[accountId]
+        holders = self.users_by_role[(accountId, role)]
+        holders.discard(userId)
+        if not holders:
+            del self.users_by_role[(accountId, role)]
+
+    def moveAccount(self, accountId: str, newParent: str | None):
+        """Re-parent an account (None makes it a root). Raises ValueError on a cycle."""
+        if newParent is not None and accountId in self._getAncestors(newParent):
+            raise ValueError(f"Moving {accountId} under {newParent} would create a cycle")
+        oldParent = self.parent_map.get(accountId)
+        if oldParent is not None:
+            self.children[oldParent].remove(accountId)
+            if not self.children[oldParent]:
+                del self.children[oldParent]
+        if newParent is not None:
+            self.children[newParent].append(accountId)
+        self.parent_map[accountId] = newParent
+
+
+class IndexedRBACRoleResolver(RBACRoleResolver):
+    """
+    RBACRoleResolver with effective roles materialized per account, so checks
+    never walk the parent chain. Filtered queries use the base class's
+    users_by_role index, which beats scanning every user with access.
+
+    effective[accountId] maps each user with access to a frozenset of their
+    inherited + direct roles. A child starts from its parent's dict and shares the
+    frozensets it doesn't change, so the index costs one dict entry per
+    (user, account) pair that has access. addRoleAssignment pushes the new role
+    down the assigned account's subtree.
+
+    Plan:
+        1. Build children from parent_map.
+        2. Walk top-down from the roots; effective[child] = effective[parent] + direct roles.
+        3. On a new assignment, DFS the subtree; stop at accounts that already have the role,
+           since everything below them has it too.
+    Performance:
+        getUserRoles O(roles), getUsersForAccount O(users), addRoleAssignment O(subtree).
+    Watch Out For:
+        An assignment near the root touches every account below it.
+    """
+
+    def _build_indexes(self, parents, triples):
+        super()._build_indexes(parents, triples)
+        self.effective = {}
+        # Roots: anything without a known parent, including parents that are not listed themselves.
+        nodes = set(self.parent_map) | set(self.children) | set(self.users_by_account)
+        for node in nodes:
+            if self.parent_map.get(node) is None:
+                self._rebuild(node)
+
+    def _rebuild(self, accountId: str):
+        """Recompute effective roles for accountId's subtree from its parent's."""
+        parent = self.parent_map.get(accountId)
+        stack = [(accountId, self.effective.get(parent, {}) if parent is not None else {})]
+        while stack:
+            account_id, inherited = stack.pop()
+            effective = inherited
+            users = self.users_by_account.get(account_id)
+            if users:
+                effective = dict(inherited)
+                for user_id in users:
+                    effective[user_id] = inherited.get(user_id, frozenset()) | self.role_map[(user_id, account_id)]
+            if effective:
+                self.effective[account_id] = effective
+            else:
+                self.effective.pop(account_id, None)
+            for child in self.children.get(account_id, ()):
+                stack.append((child, effective))
+
+    def getUserRoles(self, userId: str, accountId: str) -> list[str]:
+        return list(self.effective.get(accountId, {}).get(userId, ()))
+
+    def getUsersForAccount(self, accountId: str) -> list[str]:
+        return list(self.effective.get(accountId, ()))
+
+    def addRoleAssignment(self, userId: str, accountId: str, role: str):
+        super().addRoleAssignment(userId, accountId, role)
+        before = self.effective.get(accountId)
+        if role in (before or {}).get(userId, ()):
+            return  # Already held here, so the whole subtree has it too.
+
+        # Copy on write if this account shares its parent's dict.
+        parent_effective = self.effective.get(self.parent_map.get(accountId))
+        after = dict(before or {}) if before is None or before is parent_effective else before
+        after[userId] = after.get(userId, frozenset()) | {role}
+        self.effective[accountId] = after
+
+        # Descendants that shared the old dict share the new one; the rest get the role added.
+        stack = [(child, before, after) for child in self.children.get(accountId, ())]
+        while stack:
+            account_id, parent_before, parent_after = stack.pop()
+            before = self.effective.get(account_id)
+            if before is parent_before:
+                after = parent_after
+            elif role in (before or {}).get(userId, ()):
+                continue
+            else:
+                after = before if before is not None else {}
+                after[userId] = after.get(userId, frozenset()) | {role}
+            self.effective[account_id] = after
+            stack.extend((child, before, after) for child in self.children.get(account_id, ()))
+
+    def removeRoleAssignment(self, userId: str, accountId: str, role: str):
+        if role not in self.role_map.get((userId, accountId), ()):
+            return
+        super().removeRoleAssignment(userId, accountId, role)
+        self._rebuild(accountId)
+
+    def moveAccount(self, accountId: str, newParent: str | None):
+        super().moveAccount(accountId, newParent)
+        self._rebuild(accountId)
+
+
+class CachedRBACRoleResolver(RBACRoleResolver):
+    """
+    RBACRoleResolver with an LRU cache in front of getUserRoles and getUsersForAccount.
+
+    Every account has a version counter. A cached answer remembers the version of
+    the account it was computed for, and is only served while that version is
+    unchanged. A mutation bumps the versions of the affected subtree, so the cache
+    never has to be scanned and entries for other accounts stay valid.
+
+    Plan:
+        1. cache: OrderedDict (userId, accountId) or accountId -> (version, result), most recent last.
+        2. Hit: entry exists and its version is current -> move to end, return a copy.
+        3. Miss: compute with the base class, store, evict the oldest past maxsize.
+        4. add/remove on account A, or moving A: bump every account under A.
+    Performance:
+        Cache hit O(1). Mutations O(subtree) for the version bumps.
+    Watch Out For:
+        Stale entries are not removed eagerly; they age out of the LRU or are
+        replaced on their next miss.
+    """
+
+    def __init__(self, accounts: list[dict], user_role_assignments: list[dict], maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        super().__init__(accounts, user_role_assignments)
+
+    def _build_indexes(self, parents, triples):
+        super()._build_indexes(parents, triples)
+        # Every cached answer is stale after a reload.
+        self.cache = OrderedDict()
+        self.versions = defaultdict(int)
+
+    def _lookup(self, key, accountId: str):
+        """Cached result for key if still current, else None."""
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] == self.versions.get(accountId, 0):
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return list(entry[1])
+        self.misses += 1
+        return None
+
+    def _store(self, key, accountId: str, result: list[str]) -> list[str]:
+        self.cache[key] = (self.versions.get(accountId, 0), tuple(result))
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return result
+
+    def _invalidate(self, accountId: str):
+        for account_id in self._getDescendants(accountId):
+            self.versions[account_id] += 1
+
+    def getUserRoles(self, userId: str, accountId: str) -> list[str]:
+        key = (userId, accountId)
+        result = self._lookup(key, accountId)
+        if result is None:
+            result = self._store(key, accountId, super().getUserRoles(userId, accountId))
+        return result
+
+    def getUsersForAccount(self, accountId: str) -> list[str]:
+        # Keyed by the bare accountId, which can't collide with the (userId, accountId) tuples.
+        result = self._lookup(accountId, accountId)
+        if result is None:
+            result = self._store(accountId, accountId, super().getUsersForAccount(accountId))
+        return result
+
+    def addRoleAssignment(self, userId: str, accountId: str, role: str):
+        super().addRoleAssignment(userId, accountId, role)
+        self._invalidate(accountId)
+
+    def removeRoleAssignment(self, userId: str, accountId: str, role: str):
+        super().removeRoleAssignment(userId, accountId, role)
+        self._invalidate(accountId)
+
+    def moveAccount(self, accountId: str, newParent: str | None):
+        super().moveAccount(accountId, newParent)
+        self._invalidate(accountId)
+
+    def cache_info(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.cache), "maxsize": self.maxsize}
 
 
 # ─── Test Suite ───────────────────────────────────────────────────────────────
@@ -233,9 +576,143 @@ def test_phase4_filter_by_role():
     print("  ✅ Phase 4 passed!\n")
 
 
+def test_phase5_indexed_resolver():
+    print("=" * 60)
+    print("Phase 5: Precomputed Index")
+    print("=" * 60)
+
+    accounts = [
+        {"accountId": "team_1", "parent": "wksp_1"},  # child listed before its parent
+        {"accountId": "org_1", "parent": None},
+        {"accountId": "wksp_1", "parent": "org_1"},
+        {"accountId": "wksp_2", "parent": "org_1"},
+    ]
+    assignments = [
+        {"userId": "usr_1", "accountId": "org_1", "role": "admin"},
+        {"userId": "usr_1", "accountId": "wksp_1", "role": "editor"},
+        {"userId": "usr_2", "accountId": "wksp_1", "role": "viewer"},
+    ]
+
+    rbac = IndexedRBACRoleResolver(accounts, assignments)
+
+    result = sorted(rbac.getUserRoles("usr_1", "team_1"))
+    print(f"  usr_1 @ team_1: {result}")
+    assert result == ["admin", "editor"], f"Expected ['admin', 'editor'], got {result}"
+
+    result = sorted(rbac.getUsersForAccount("wksp_2"))
+    print(f"  Users @ wksp_2: {result}")
+    assert result == ["usr_1"], f"Expected ['usr_1'], got {result}"
+
+    # A new assignment on wksp_1 reaches team_1 but not its parent or sibling.
+    rbac.addRoleAssignment("usr_3", "wksp_1", "billing")
+    result = sorted(rbac.getUsersForAccountWithFilter("team_1", ["billing"]))
+    print(f"  Filter ['billing'] @ team_1 after add: {result}")
+    assert result == ["usr_3"], f"Expected ['usr_3'], got {result}"
+    assert rbac.getUserRoles("usr_3", "org_1") == []
+    assert rbac.getUserRoles("usr_3", "wksp_2") == []
+
+    # The index must agree with the parent-walking resolver.
+    plain = RBACRoleResolver(accounts, assignments)
+    plain.addRoleAssignment("usr_3", "wksp_1", "billing")
+    for account in ["org_1", "wksp_1", "wksp_2", "team_1"]:
+        assert sorted(rbac.getUsersForAccount(account)) == sorted(plain.getUsersForAccount(account))
+        for user_id in ["usr_1", "usr_2", "usr_3"]:
+            assert sorted(rbac.getUserRoles(user_id, account)) == sorted(plain.getUserRoles(user_id, account))
+
+    print("  ✅ Phase 5 passed!\n")
+
+
+def test_phase6_mutations_and_cache():
+    print("=" * 60)
+    print("Phase 6: Remove, Move and Cached Checks")
+    print("=" * 60)
+
+    accounts = [
+        {"accountId": "org_1", "parent": None},
+        {"accountId": "wksp_1", "parent": "org_1"},
+        {"accountId": "wksp_2", "parent": "org_1"},
+        {"accountId": "team_1", "parent": "wksp_1"},
+    ]
+    assignments = [
+        {"userId": "usr_1", "accountId": "org_1", "role": "admin"},
+        {"userId": "usr_2", "accountId": "wksp_1", "role": "editor"},
+        {"userId": "usr_3", "accountId": "wksp_2", "role": "viewer"},
+    ]
+
+    for resolver_cls in (RBACRoleResolver, IndexedRBACRoleResolver, CachedRBACRoleResolver):
+        rbac = resolver_cls(accounts, assignments)
+        assert sorted(rbac.getUsersForAccount("team_1")) == ["usr_1", "usr_2"]
+
+        # team_1 moves from wksp_1 to wksp_2: it loses usr_2 and gains usr_3.
+        rbac.moveAccount("team_1", "wksp_2")
+        result = sorted(rbac.getUsersForAccount("team_1"))
+        print(f"  {resolver_cls.__name__}: users @ team_1 after move: {result}")
+        assert result == ["usr_1", "usr_3"], f"Expected ['usr_1', 'usr_3'], got {result}"
+
+        rbac.removeRoleAssignment("usr_1", "org_1", "admin")
+        assert rbac.getUserRoles("usr_1", "team_1") == []
+        assert sorted(rbac.getUsersForAccount("team_1")) == ["usr_3"]
+
+        try:
+            rbac.moveAccount("org_1", "team_1")
+            assert False, "Expected a cycle error"
+        except ValueError:
+            pass
+
+    # Unrelated subtrees keep their cache entries across a mutation.
+    rbac = CachedRBACRoleResolver(accounts, assignments, maxsize=10)
+    rbac.getUserRoles("usr_3", "wksp_2")
+    rbac.getUserRoles("usr_2", "team_1")
+    rbac.addRoleAssignment("usr_2", "wksp_1", "billing")
+    assert rbac.getUserRoles("usr_3", "wksp_2") == ["viewer"]           # hit
+    assert sorted(rbac.getUserRoles("usr_2", "team_1")) == ["billing", "editor"]  # invalidated
+    info = rbac.cache_info()
+    print(f"  Cache info: {info}")
+    assert (info["hits"], info["misses"]) == (1, 3), f"Expected 1 hit / 3 misses, got {info}"
+
+    print("  ✅ Phase 6 passed!\n")
+
+
+def test_phase7_snapshot():
+    print("=" * 60)
+    print("Phase 7: Bulk Load and Snapshot")
+    print("=" * 60)
+
+    accounts = [
+        {"accountId": "team_1", "parent": "wksp_1"},
+        {"accountId": "wksp_1", "parent": "org_1"},
+        {"accountId": "org_1", "parent": None},
+    ]
+    assignments = [
+        {"userId": "usr_1", "accountId": "org_1", "role": "admin"},
+        {"userId": "usr_2", "accountId": "wksp_1", "role": "editor"},
+        {"userId": "usr_2", "accountId": "wksp_1", "role": "viewer"},
+    ]
+
+    fd, path = tempfile.mkstemp(suffix=".rbac")
+    os.close(fd)
+    try:
+        for resolver_cls in (RBACRoleResolver, IndexedRBACRoleResolver, CachedRBACRoleResolver):
+            rbac = resolver_cls(accounts, assignments)
+            rbac.save_snapshot(path)
+            restored = resolver_cls.load_snapshot(path)
+            result = sorted(restored.getUserRoles("usr_2", "team_1"))
+            print(f"  {resolver_cls.__name__}: usr_2 @ team_1 after reload: {result}")
+            assert result == ["editor", "viewer"], f"Expected ['editor', 'viewer'], got {result}"
+            assert restored.parent_map == rbac.parent_map
+            assert dict(restored.role_map) == dict(rbac.role_map)
+    finally:
+        os.remove(path)
+
+    print("  ✅ Phase 7 passed!\n")
+
+
 if __name__ == "__main__":
     test_phase1_direct_lookup()
     test_phase2_inheritance()
     test_phase3_users_for_account()
     test_phase4_filter_by_role()
+    test_phase5_indexed_resolver()
+    test_phase6_mutations_and_cache()
+    test_phase7_snapshot()
     print("🎉 All phases passed!")
@@ -21,6 +21,13 @@ with open('output.csv', 'w', newline='') as f:
     writer.writerow(['Alice', 30])         # single row
     writer.writerows([['Bob', 25], ['Carol', 28]])  # multiple rows
 
+# 4. Large CSV files: memory-map and decode only the columns you need
+# (practice/src/mmap_csv.py, no quoted fields; run from practice/src with PYTHONPATH=.)
+from mmap_csv import MappedCSV
+with MappedCSV('data.csv') as reader:
+    for account_name, amount in reader.rows(['account_name', 'amount']):
+        print(account_name, amount)  # only these two fields become strings
+
 
 import json
 # 1. Read JSON file
@@ -0,0 +1,35 @@
+# Integer codes for string columns, shared by the practice modules.
+#
+# The vectorized solutions (transaction fees, currency conversion) turn a column of
+# country / currency / merchant strings into small ints, so NumPy can group, pack
+# and fancy-index by them.
+#
+# Usage:
+#
+#   names, codes = encode_column(['US', 'UK', 'US'])
+#   # names == ['US', 'UK'], codes == array([0, 1, 0]); names[codes[i]] is row i
+#
+# Modules import it by name, so run them from practice/src with PYTHONPATH=.
+# (see the Importing note in mmap_csv.py).
+#
+# Notes:
+#
+# A NumPy array goes through np.unique, so its names come out sorted. Any other
+# sequence is coded with a dict in first-seen order, without converting the list of
+# Python strings to an array first.
+# Callers must only rely on names[codes[i]] == values[i], not on the order.
+
+
+def encode_column(values):
+    """Return (distinct values, int64 code per row). Codes index into the distinct values."""
+    import numpy as np
+
+    if isinstance(values, np.ndarray):
+        names, codes = np.unique(values, return_inverse=True)
+        return names.tolist(), codes
+    lookup = {}
+    for value in values:
+        if value not in lookup:
+            lookup[value] = len(lookup)
+    codes = np.fromiter(map(lookup.__getitem__, values), dtype=np.int64, count=len(values))
+    return list(lookup), codes
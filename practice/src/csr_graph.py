@@ -0,0 +1,194 @@
+# Compressed sparse row (CSR) graphs shared by the practice modules.
+#
+# The graph solutions here store adjacency as a dict of lists of tuples. Every
+# edge then costs a tuple, a list slot and a boxed int or float per field, which
+# is 100+ bytes, and a traversal chases pointers all over the heap. CSRGraph keeps
+# the same information in flat arrays:
+#
+#   nodes     node id -> name; ids are assigned in first-seen order
+#   index     name -> node id
+#   offsets   the edges leaving node u are offsets[u]:offsets[u + 1]
+#   targets   target node id per edge
+#   columns   one array per edge field (cost, rate, ...), parallel to targets
+#
+# Usage:
+#
+#   graph = CSRGraph.from_edges(
+#       [('US', 'UK', 'UPS', 4), ('UK', 'CA', 'FedEx', 10)],
+#       columns=[('method', None), ('cost', 'q')])
+#   # or, when the fields are already split into columns:
+#   graph = CSRGraph.from_columns(['US', 'UK'], ['UK', 'CA'],
+#                                 [('method', None, ['UPS', 'FedEx']), ('cost', 'q', [4, 10])])
+#   u = graph.index['US']
+#   for e in graph.edge_range(u):
+#       graph.nodes[graph.targets[e]], graph.label('method', e), graph.columns['cost'][e]
+#
+# Modules import it by name, so run them from practice/src with PYTHONPATH=.
+# (see the Importing note in mmap_csv.py).
+#
+# Notes:
+#
+# A column typecode is an array module typecode. None means the field is a string
+# to intern: the column then holds int ids and graph.labels[name] maps them back.
+# Edges keep their input order within each source (the sort by source is stable).
+# split_records() cuts a large "a:b:c,a:b:c" string into blocks of columns for
+# from_column_chunks(), so the field strings never all exist at once.
+# NumPy, when installed, does the sort and the gathers; without it the same steps
+# run through sorted() and map(), a few times slower on a million edges.
+# Iterating a graph, len() and `in` work on node names like a dict's keys, so code
+# written against {node: [edges]} can still ask "is this a node?" and "how many?".
+# The graph is immutable once built.
+
+from array import array
+from collections import Counter
+from itertools import accumulate
+from operator import methodcaller
+
+
+class _Interner(dict):
+    """name -> dense id, handing out the next id on first lookup."""
+
+    def __missing__(self, key):
+        value = self[key] = len(self)
+        return value
+
+
+class CSRGraph:
+    """Directed graph with interned node ids, an offsets array and parallel edge arrays."""
+
+    def __init__(self, nodes, offsets, targets, columns, labels=None):
+        self.nodes = nodes
+        self.index = {name: i for i, name in enumerate(nodes)}
+        self.offsets = offsets
+        self.targets = targets
+        self.columns = columns
+        self.labels = labels or {}
+
+    @classmethod
+    def from_edges(cls, edges, columns=()):
+        """Build from an iterable of (source, target, *values); columns gives (name, typecode) per value."""
+        columns = list(columns)
+        fields = list(zip(*edges)) or [()] * (2 + len(columns))
+        if len(fields) != 2 + len(columns):
+            raise ValueError(f"Edges have {len(fields) - 2} values but {len(columns)} columns were named")
+        return cls.from_columns(fields[0], fields[1], [(name, typecode, field)
+                                                       for (name, typecode), field in zip(columns, fields[2:])])
+
+    @classmethod
+    def from_columns(cls, sources, targets, columns=()):
+        """Build from parallel sequences: source names, target names and (name, typecode, values) per field."""
+        return cls.from_column_chunks([(sources, targets, *(values for _, _, values in columns))],
+                                      [(name, typecode) for name, typecode, _ in columns])
+
+    @classmethod
+    def from_column_chunks(cls, chunks, columns=()):
+        """Like from_columns, but chunks yields (sources, targets, *values) one slice of the edges at a time."""
+        columns = list(columns)
+        # Interning goes through map() in C; only a first sighting calls back into Python.
+        index = _Interner()
+        source_ids = array('q')
+        target_ids = array('q')
+        values = [array(typecode or 'q') for _, typecode in columns]
+        lookups = [_Interner() if typecode is None else None for _, typecode in columns]
+
+        for sources, targets, *fields in chunks:
+            if len(fields) != len(columns):
+                raise ValueError(f"Edges have {len(fields)} values but {len(columns)} columns were named")
+            source_ids.extend(map(index.__getitem__, sources))
+            target_ids.extend(map(index.__getitem__, targets))
+            for column, lookup, field in zip(values, lookups, fields):
+                column.extend(field if lookup is None else map(lookup.__getitem__, field))
+            if any(len(ids) != len(source_ids) for ids in (target_ids, *values)):
+                raise ValueError(f"Edge columns have different lengths at edge {len(source_ids)}")
+
+        labels = {name: list(lookup) for (name, _), lookup in zip(columns, lookups) if lookup is not None}
+        return cls._from_arrays(list(index), source_ids, target_ids,
+                                {name: column for (name, _), column in zip(columns, values)}, labels)
+
+    @classmethod
+    def _from_arrays(cls, nodes, sources, targets, columns, labels=None):
+        """Group unsorted edge arrays by source: a stable sort plus a prefix sum of the out-degrees."""
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+
+        if np is not None:
+            # Same steps on zero-copy views of the arrays, without boxing every edge.
+            source_view = np.frombuffer(sources, dtype=np.int64)
+            order = np.argsort(source_view, kind='stable')
+            offsets = array('q', [0])
+            offsets.frombytes(np.cumsum(np.bincount(source_view, minlength=len(nodes))).tobytes())
+
+            def permute(values):
+                permuted = array(values.typecode)
+                permuted.frombytes(np.frombuffer(values, dtype=values.typecode)[order].tobytes())
+                return permuted
+        else:
+            counts = Counter(sources)
+            offsets = array('q', [0])
+            offsets.extend(accumulate(counts.get(node, 0) for node in range(len(nodes))))
+            order = sorted(range(len(sources)), key=sources.__getitem__)
+
+            def permute(values):
+                return array(values.typecode, map(values.__getitem__, order))
+
+        columns = {name: permute(column) for name, column in columns.items()}
+        return cls(nodes, offsets, permute(targets), columns, labels)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    @property
+    def num_edges(self):
+        return len(self.targets)
+
+    def edge_range(self, node):
+        """Edge positions leaving node id, for indexing targets and the columns."""
+        return range(self.offsets[node], self.offsets[node + 1])
+
+    def out_degree(self, node):
+        return self.offsets[node + 1] - self.offsets[node]
+
+    def label(self, column, edge):
+        """The original string of an interned column at an edge position."""
+        return self.labels[column][self.columns[column][edge]]
+
+    def nbytes(self):
+        """Bytes held by the offset and edge arrays (not the node names)."""
+        arrays = [self.offsets, self.targets, *self.columns.values()]
+        return sum(len(a) * a.itemsize for a in arrays)
+
+
+def split_records(text, fields, record_sep=',', field_sep=':', block_size=1 << 20):
+    """Yield one list per field for each ~block_size slice of "a:b:c,a:b:c,..." text.
+
+    Only one block of field strings exists at a time, so a CSR build from a large
+    string peaks near the size of its arrays rather than of every field at once.
+    Raises ValueError naming the first record (0-based) without exactly `fields` fields.
+    """
+    start, size = 0, len(text)
+    separators = fields - 1
+    first_record = 0
+    while start < size:
+        end = text.find(record_sep, start + block_size) if start + block_size < size else -1
+        if end == -1:
+            end = size
+        records = text[start:end].split(record_sep)
+        if end == size and len(records) > 1 and not records[-1]:
+            records.pop()  # trailing separator, same as when a block boundary lands on it
+        # One count() per record, all in C; only a bad block is scanned again in Python.
+        if any(count != separators for count in set(map(methodcaller('count', field_sep), records))):
+            bad = next(i for i, record in enumerate(records) if record.count(field_sep) != separators)
+            raise ValueError(f"Record {first_record + bad} has {records[bad].count(field_sep) + 1} fields, "
+                             f"expected {fields}: {records[bad][:60]!r}")
+        parts = field_sep.join(records).split(field_sep)
+        yield [parts[k::fields] for k in range(fields)]
+        first_record += len(records)
+        start = end + 1
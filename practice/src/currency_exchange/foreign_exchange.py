@@ -137,3 +137,631 @@ def getRate(self, from_curr, to_curr):
     dfs(from_curr, 1.0, {from_curr})
     return best_rate[0]
 
+
+#part 5
+
+# Plan:
+#   Best rate = max product of edge rates = min sum of -log(rate), so this is a
+#   shortest-path problem. Rates above 1 give negative weights, which rules out
+#   Dijkstra; run SPFA (queue-based Bellman-Ford) from the source instead.
+#   A cycle whose rates multiply to more than 1 is a negative cycle: an arbitrage
+#   loop. Raise ArbitrageError with the loop instead of following it.
+# Performance:
+#   O(V * E) worst case per source, usually close to O(E). The best rate to every
+#   currency is cached per source, so repeated queries from one source are O(1).
+# Watch Out For:
+#   A consistent sheet has cycles that multiply to exactly 1, but rates quoted to
+#   d significant digits are each off by up to 5e-d, and that adds up around a long
+#   cycle. Improvements below EPSILON (in log space, so relative) are ignored; the
+#   default suits quotes of 9+ digits. Raise it for coarser feeds (~1e-4 for 6).
+
+import math
+from collections import deque
+
+from column_codes import encode_column  # practice/src/column_codes.py
+
+
+class ArbitrageError(Exception):
+    def __init__(self, cycle, gain):
+        self.cycle = cycle  # [c0, c1, ..., c0]
+        self.gain = gain    # product of the rates around the cycle
+        super().__init__(f"Arbitrage cycle {' -> '.join(cycle)} multiplies to {gain:.6f}")
+
+
+class CurrencyConverter:
+    EPSILON = 1e-6
+    DEFAULT_MINOR_UNITS = 2  # convert_many, for a currency missing from minor_units
+
+    def __init__(self, rate_string):
+        self.graph = defaultdict(list)  # currency -> [(neighbor, rate, -log(rate)), ...]
+        self._best = {}  # source -> {currency: best rate from source}
+        self._parse_rates(rate_string)
+
+    def _parse_rates(self, rate_string):
+        if not rate_string:
+            return
+
+        for entry in rate_string.split(","):
+            parts = entry.split(":")
+            from_curr, to_curr, rate = parts[0], parts[1], float(parts[2])
+            if rate <= 0:
+                raise ValueError(f"Rate must be positive: {entry}")
+
+            # Store both directions
+            self.graph[from_curr].append((to_curr, rate, -math.log(rate)))
+            self.graph[to_curr].append((from_curr, 1.0 / rate, math.log(rate)))
+
+    def _relax(self, sources):
+        """SPFA from sources; returns {currency: best rate}. Raises ArbitrageError on a negative cycle."""
+        graph = self.graph
+        limit = len(graph)
+        dist = dict.fromkeys(sources, 0.0)
+        rate = dict.fromkeys(sources, 1.0)
+        parent = dict.fromkeys(sources)
+        hops = dict.fromkeys(sources, 0)
+        queue = deque(sources)
+        queued = set(sources)
+
+        while queue:
+            current = queue.popleft()
+            queued.discard(current)
+            base, base_rate, base_hops = dist[current], rate[current], hops[current] + 1
+            for neighbor, edge_rate, weight in graph[current]:
+                candidate = base + weight
+                if candidate < dist.get(neighbor, math.inf) - self.EPSILON:
+                    dist[neighbor] = candidate
+                    rate[neighbor] = base_rate * edge_rate
+                    parent[neighbor] = current
+                    hops[neighbor] = base_hops
+                    # A best path with V or more edges repeats a currency: negative cycle.
+                    if base_hops >= limit:
+                        error = self._arbitrage(parent, neighbor)
+                        if error is not None:
+                            raise error
+                    if neighbor not in queued:
+                        queue.append(neighbor)
+                        queued.add(neighbor)
+        return rate
+
+    def _arbitrage(self, parent, start):
+        # Follow parents until a currency repeats; that loop is the cycle. With several
+        # sources the chain can end at one first, so keep relaxing (return None).
+        seen = set()
+        current = start
+        while current is not None and current not in seen:
+            seen.add(current)
+            current = parent[current]
+        if current is None:
+            return None
+        cycle = [current]
+        node = parent[current]
+        while node != current:
+            cycle.append(node)
+            node = parent[node]
+        cycle.append(current)
+        cycle.reverse()
+
+        gain = 1.0
+        for a, b in zip(cycle, cycle[1:]):
+            gain *= max(edge_rate for neighbor, edge_rate, _ in self.graph[a] if neighbor == b)
+        return ArbitrageError(cycle, gain)
+
+    def getRate(self, from_curr, to_curr):
+        if from_curr == to_curr:
+            return 1.0
+        if from_curr not in self.graph:
+            return None
+
+        best = self._best.get(from_curr)
+        if best is None:
+            best = self._best[from_curr] = self._relax([from_curr])
+        return best.get(to_curr)
+
+    def find_arbitrage(self):
+        """Return an ArbitrageError describing one arbitrage cycle, or None if the sheet has none."""
+        try:
+            self._relax(list(self.graph))
+        except ArbitrageError as error:
+            return error
+        return None
+
+    # Part 7 follow-up: converting a whole settlement file, see the notes there.
+    def convert_many(self, amounts, from_codes, to_codes, minor_units=None):
+        """Convert amounts[i] from from_codes[i] to to_codes[i]. Returns a NumPy array."""
+        import numpy as np
+
+        amounts = np.asarray(amounts)
+        n = len(amounts)
+        if len(from_codes) != n or len(to_codes) != n:
+            raise ValueError("amounts, from_codes and to_codes must have the same length")
+        if n == 0:
+            return np.zeros(0, dtype=np.int64 if minor_units is not None else np.float64)
+
+        if isinstance(from_codes, np.ndarray) and isinstance(to_codes, np.ndarray):
+            currencies, index = encode_column(np.concatenate([from_codes, to_codes]))
+        else:
+            currencies, index = encode_column(list(from_codes) + list(to_codes))
+        pairs, row_pair = np.unique(index[:n] * len(currencies) + index[n:], return_inverse=True)
+
+        rates = np.empty(len(pairs))
+        for k, pair in enumerate(pairs.tolist()):
+            from_curr, to_curr = currencies[pair // len(currencies)], currencies[pair % len(currencies)]
+            rate = self.getRate(from_curr, to_curr)
+            if rate is None:
+                raise ValueError(f"No rate from {from_curr} to {to_curr}")
+            if minor_units is not None:
+                default = self.DEFAULT_MINOR_UNITS
+                rate *= 10.0 ** (minor_units.get(to_curr, default) - minor_units.get(from_curr, default))
+            rates[k] = rate
+
+        converted = amounts * rates[row_pair]
+        if minor_units is None:
+            return converted
+        return np.rint(converted).astype(np.int64)
+
+
+#part 6
+
+# Follow-up: the same pairs are priced millions of times a day, so pay for the
+# search once per sheet and make getRate an array read.
+
+# Plan:
+#   Intern every currency to an index 0..n-1 and build an n x n weight matrix W of
+#   -log(rate) (inf when there is no quote, 0 on the diagonal). Floyd-Warshall turns
+#   it into the all-pairs distance matrix D; the rate matrix is exp(-D).
+#   Floyd-Warshall blows up on negative loops, even the 1e-9 ones rounding leaves on
+#   a consistent sheet, so reweight first (Johnson): one part 5 search from every
+#   currency gives potentials h, W[u, v] + h[u] - h[v] is >= 0 up to rounding, and
+#   that search is also what raises ArbitrageError for a bad sheet.
+#   update_rate(a, b, rate) replaces the quote for that pair, which changes two
+#   directed edges: one gets cheaper, the other more expensive.
+#     - Cheaper edge u->v (weight w): D = min(D, D[:, u] + w + D[v, :]). O(n^2).
+#     - Dearer edge u->v: only pairs whose every best path used it can change. Run
+#       Bellman-Ford from u and into v without the edge: rows that lost their best
+#       way to v and columns u lost its best way to are the only ones to redo, so
+#       rerun Bellman-Ford for those sources (or those targets, whichever is fewer).
+#   After the cheaper edge, a negative diagonal entry means the new rate opened an
+#   arbitrage loop: undo the update and raise ArbitrageError.
+# Performance:
+#   Build O(n^3) in NumPy, getRate O(1). An update is O(n^2) plus one Bellman-Ford
+#   pass per affected row or column, which is usually a handful.
+# Watch Out For:
+#   Checking D[s, u] + w + D[v, t] == D[s, t] is not enough to find the affected
+#   pairs: u->v->u always multiplies to exactly 1, so every pair "goes through" the
+#   edge by that detour. Recomputing the smaller side (rows vs columns) keeps a
+#   change to a star-shaped feed (everything quoted against USD) to one column.
+#   A currency the sheet has never seen changes n, so it rebuilds everything.
+
+
+import copy
+
+
+def _floyd_warshall(dist):
+    """All-pairs shortest paths in place over an n x n matrix of non-negative weights."""
+    import numpy as np
+
+    for k in range(len(dist)):
+        np.minimum(dist, dist[:, k, None] + dist[k], out=dist)
+    return dist
+
+
+def _bellman_ford_rows(weights, sources, epsilon):
+    """Shortest distances from each source to every node: a len(sources) x n matrix."""
+    import numpy as np
+
+    n = len(weights)
+    # Edges grouped by target, so each round is one reduceat per target.
+    dst, src = np.nonzero(np.isfinite(weights.T))
+    edge_weights = weights[src, dst]
+    targets, starts = np.unique(dst, return_index=True)
+
+    dist = np.full((len(sources), n), np.inf)
+    dist[np.arange(len(sources)), sources] = 0.0
+    for _ in range(n):
+        candidates = dist[:, src] + edge_weights
+        updated = dist.copy()
+        updated[:, targets] = np.minimum.reduceat(candidates, starts, axis=1)
+        # Rounded quotes leave cycles a hair below zero; stop once nothing moves by epsilon.
+        converged = not (updated < dist - epsilon).any()
+        dist = updated
+        if converged:
+            break
+    return dist
+
+
+class MatrixCurrencyConverter(CurrencyConverter):
+    def __init__(self, rate_string):
+        super().__init__(rate_string)
+        self._build_matrix()
+
+    def _build_matrix(self):
+        import numpy as np
+
+        self.codes = list(self.graph)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        n = len(self.codes)
+        weights = np.full((n, n), np.inf)
+        np.fill_diagonal(weights, 0.0)
+        for from_curr, edges in self.graph.items():
+            i = self.index[from_curr]
+            for to_curr, _, weight in edges:
+                j = self.index[to_curr]
+                # Duplicate quotes keep the best one, like the graph search does.
+                weights[i, j] = min(weights[i, j], weight)
+        self.weights = weights
+
+        # Johnson-style reweighting: potentials from the graph search (which raises on
+        # arbitrage) make every edge non-negative up to rounding, so clip that away.
+        potential = np.zeros(n)
+        for code, rate in self._relax(self.codes).items():
+            potential[self.index[code]] = -math.log(rate)
+        reduced = weights + potential[:, None] - potential[None, :]
+        np.maximum(reduced, 0.0, out=reduced)
+        self.dist = _floyd_warshall(reduced) - potential[:, None] + potential[None, :]
+        self.matrix = np.exp(-self.dist)  # unreachable pairs come out as 0.0
+
+    def getRate(self, from_curr, to_curr):
+        if from_curr == to_curr:
+            return 1.0
+        i = self.index.get(from_curr)
+        j = self.index.get(to_curr)
+        if i is None or j is None:
+            return None
+        rate = self.matrix[i, j]
+        return float(rate) if rate else None
+
+    def fork(self):
+        """Copy for a writer: own graph dict and arrays, so updating it leaves self untouched."""
+        converter = copy.copy(self)
+        converter.graph = defaultdict(list, self.graph)
+        converter._best = {}
+        converter.weights = self.weights.copy()
+        converter.dist = self.dist.copy()
+        return converter
+
+    def update_rate(self, from_curr, to_curr, rate):
+        """Replace the quote for from_curr:to_curr (either direction) and refresh the matrix."""
+        self.update_rates([(from_curr, to_curr, rate)])
+
+    def update_rates(self, updates):
+        """update_rate for several (from, to, rate) ticks, refreshing the rate matrix once at the end.
+
+        Ticks are applied in place one at a time. A tick that opens an arbitrage loop is
+        rolled back and raises ArbitrageError; the ticks before it stay applied.
+        """
+        import numpy as np
+
+        try:
+            for from_curr, to_curr, rate in updates:
+                self._apply_rate(from_curr, to_curr, rate)
+        finally:
+            self.matrix = np.exp(-self.dist)
+
+    def _apply_rate(self, from_curr, to_curr, rate):
+        import numpy as np
+
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive: {from_curr}:{to_curr}:{rate}")
+        if from_curr == to_curr:
+            raise ValueError(f"Cannot quote a currency against itself: {from_curr}")
+
+        new_codes = [code for code in (from_curr, to_curr) if code not in self.graph]
+        saved_edges = (self.graph[from_curr], self.graph[to_curr])
+        self.graph[from_curr] = [e for e in self.graph[from_curr] if e[0] != to_curr]
+        self.graph[to_curr] = [e for e in self.graph[to_curr] if e[0] != from_curr]
+        self.graph[from_curr].append((to_curr, rate, -math.log(rate)))
+        self.graph[to_curr].append((from_curr, 1.0 / rate, math.log(rate)))
+        self._best = {}
+
+        def restore_graph():
+            self.graph[from_curr], self.graph[to_curr] = saved_edges
+            for code in new_codes:
+                del self.graph[code]
+            self._best = {}
+
+        if new_codes:
+            # A new currency changes n: rebuild into fresh arrays, keeping the old ones for a rollback.
+            saved = (self.codes, self.index, self.weights, self.dist, self.matrix)
+            try:
+                self._build_matrix()
+            except ArbitrageError:
+                restore_graph()
+                self.codes, self.index, self.weights, self.dist, self.matrix = saved
+                raise
+            return
+
+        i, j = self.index[from_curr], self.index[to_curr]
+        undo = []  # ("weight", (u, v), old) / ("rows", rows, old rows) / ("cols", cols, old columns)
+        changes = [(i, j, -math.log(rate)), (j, i, math.log(rate))]
+        # Dearer edges first: they only need D to be correct before the update.
+        changes.sort(key=lambda change: change[2] <= self.weights[change[0], change[1]])
+        for u, v, weight in changes:
+            old = self.weights[u, v]
+            undo.append(("weight", (u, v), old))
+            self.weights[u, v] = weight
+            if weight > old:
+                self._raise_edge(u, v, old, undo)
+            elif weight < old:
+                self._lower_edge(u, v, weight, undo)
+
+        diagonal = np.einsum('ii->i', self.dist)
+        if (diagonal < -self.EPSILON).any():
+            error = self._matrix_arbitrage()
+            if error is not None:
+                self._rollback(undo)
+                restore_graph()
+                raise error
+        np.maximum(diagonal, 0.0, out=diagonal)
+
+    def _rollback(self, undo):
+        """Put back the weights and the dist rows / columns an update overwrote, newest first."""
+        for kind, index, old in reversed(undo):
+            if kind == "weight":
+                self.weights[index] = old
+            elif kind == "rows":
+                self.dist[index] = old
+            else:
+                self.dist[:, index] = old
+
+    def _matrix_arbitrage(self):
+        import numpy as np
+
+        # The matrix only says some loop through k dips below -EPSILON. Let the graph
+        # search from k confirm it and recover the cycle, so both modes agree on what
+        # counts as arbitrage. None means the loop is within rounding after all.
+        k = int(np.argmin(np.diagonal(self.dist)))
+        try:
+            self._relax([self.codes[k]])
+        except ArbitrageError as error:
+            return error
+        return None
+
+    def _lower_edge(self, u, v, weight, undo):
+        import numpy as np
+
+        dist = self.dist
+        candidate = dist[:, u, None] + weight + dist[v]
+        improved = candidate < dist
+        rows = np.flatnonzero(improved.any(axis=1))
+        if len(rows):
+            undo.append(("rows", rows, dist[rows]))  # fancy indexing copies
+            np.copyto(dist, candidate, where=improved)
+
+    def _raise_edge(self, u, v, old, undo):
+        import numpy as np
+
+        dist, weights = self.dist, self.weights
+        if old > dist[u, v] + self.EPSILON:
+            return  # the edge was not on any best path
+        # Search from u and into v without the edge. A row s changes only if s loses its
+        # best way to v, and a column t only if u loses its best way to t.
+        weight, weights[u, v] = weights[u, v], np.inf
+        from_u = _bellman_ford_rows(weights, [u], self.EPSILON)[0]
+        into_v = _bellman_ford_rows(weights.T, [v], self.EPSILON)[0]
+        weights[u, v] = weight
+        rows = np.flatnonzero(into_v > dist[:, v] + self.EPSILON)
+        cols = np.flatnonzero(from_u > dist[u] + self.EPSILON)
+        if not len(rows) or not len(cols):
+            return
+        if len(rows) <= len(cols):
+            undo.append(("rows", rows, dist[rows]))
+            dist[rows] = _bellman_ford_rows(weights, rows, self.EPSILON)
+        else:
+            # Distances into a target are distances from it on the reversed graph.
+            undo.append(("cols", cols, dist[:, cols]))
+            dist[:, cols] = _bellman_ford_rows(weights.T, cols, self.EPSILON).T
+
+
+#part 7
+
+# Follow-up: convert a settlement file with millions of amounts in mixed currencies.
+
+# Plan:
+#   Intern the from and to codes together, pack each row's pair into one integer
+#   (from * m + to) and np.unique it. Look up each distinct pair once with getRate,
+#   then one fancy-index spreads the rates back over the rows and one multiply
+#   converts everything.
+#   With minor_units ({currency: decimal places}, 2 when missing) the amounts are
+#   integers in the source currency's minor units (cents, yen, fils). The exponent
+#   shift is folded into each pair's rate, and the result is rounded half to even
+#   into an int64 array of the target's minor units.
+# Performance:
+#   O(n log n) for the unique, plus one getRate per distinct pair rather than per row.
+# Watch Out For:
+#   A pair with no rate raises ValueError: a settlement file should not silently
+#   get NaN or 0 for some rows. Amounts above 2^53 minor units lose precision in float64.
+
+# Code: CurrencyConverter.convert_many in part 5, so the part 6, 8 and 9 converters
+# inherit it. The codes are interned with column_codes.encode_column
+# (practice/src/column_codes.py), shared with the vectorized transaction fees.
+
+
+#part 8
+
+# Follow-up: apply live rate ticks while many threads are quoting.
+
+# Plan:
+#   Readers never lock. The current state is one immutable RateSnapshot (version +
+#   converter) held in a single attribute; reading that attribute is atomic, and a
+#   reader uses the snapshot it grabbed for the whole call.
+#   apply_rates(updates, batch_size) is the only writer path. Under a writer lock it
+#   forks the current converter (the dict of edges and the NumPy arrays are copied
+#   once), applies one batch of ticks to the fork in place with the part 6
+#   incremental update, refreshes its rate matrix once, then publishes a new
+#   snapshot by swapping the attribute. A reader sees either the whole batch or none of it.
+#   Every answer carries the version of the snapshot it came from.
+# Performance:
+#   Reads: one attribute load plus the part 6 O(1) lookup. Writes: one fork per
+#   batch (O(n^2) for the matrices) plus the incremental update per tick, so larger
+#   batches amortize the copy at the cost of staler quotes.
+# Watch Out For:
+#   A batch is all or nothing. If any tick opens an arbitrage loop, ArbitrageError
+#   propagates, the fork is dropped and the published snapshot (and every batch
+#   published before it) stays as it was.
+#   Several lookups that must agree (a quote and its inverse, a convert_many run)
+#   should go through one snapshot() rather than separate calls.
+
+import threading
+
+
+class RateSnapshot:
+    __slots__ = ("version", "converter")
+
+    def __init__(self, version, converter):
+        self.version = version
+        self.converter = converter
+
+    def get_rate(self, from_curr, to_curr):
+        return self.converter.getRate(from_curr, to_curr)
+
+
+class StreamingCurrencyConverter:
+    def __init__(self, rate_string, converter_cls=MatrixCurrencyConverter):
+        # Publishing forks the converter and updates the fork, so only the part 6
+        # incremental converter (or a subclass of it) can back a feed.
+        if not (hasattr(converter_cls, 'fork') and hasattr(converter_cls, 'update_rates')):
+            raise TypeError(f"{converter_cls.__name__} has no fork()/update_rates(); use MatrixCurrencyConverter")
+        self._write_lock = threading.Lock()
+        self._snapshot = RateSnapshot(0, converter_cls(rate_string))
+
+    def snapshot(self):
+        return self._snapshot
+
+    def getRate(self, from_curr, to_curr):
+        return self._snapshot.converter.getRate(from_curr, to_curr)
+
+    def get_rate_with_version(self, from_curr, to_curr):
+        """Return (rate, version of the snapshot the rate came from)."""
+        snapshot = self._snapshot
+        return snapshot.converter.getRate(from_curr, to_curr), snapshot.version
+
+    def apply_rates(self, updates, batch_size=None):
+        """Apply (from, to, rate) ticks, publishing a snapshot every batch_size ticks. Returns the last version."""
+        batch = []
+        for update in updates:
+            batch.append(update)
+            if batch_size is not None and len(batch) >= batch_size:
+                self._publish(batch)
+                batch = []
+        if batch:
+            self._publish(batch)
+        return self._snapshot.version
+
+    def _publish(self, batch):
+        with self._write_lock:
+            current = self._snapshot
+            # One O(n^2) copy per batch; the ticks then update the fork in place.
+            converter = current.converter.fork()
+            converter.update_rates(batch)
+            self._snapshot = RateSnapshot(current.version + 1, converter)
+
+
+#part 9
+
+# Follow-up: graph memory. Every quote is two (neighbor, rate, weight) tuples in
+# lists under a defaultdict, ~150 bytes per quote before the rates are even used.
+
+# Plan:
+#   Store the graph as a CSRGraph (practice/src/csr_graph.py): interned
+#   currency ids, an offsets array, and parallel target / rate / weight arrays.
+#   Parse a block at a time with one flat split and strided slices instead of a
+#   split per entry, so the field strings never all exist at once.
+#   Same SPFA and arbitrage detection as part 5, on ids and flat lists; getRate,
+#   find_arbitrage and convert_many are inherited, since the CSR graph answers
+#   `in`, len() and iteration over currency codes like the dict did.
+# Performance:
+#   ~40 bytes per quote (two edges of target + rate + weight), and the search
+#   reads contiguous arrays instead of chasing tuples.
+
+import operator
+from array import array
+
+from csr_graph import CSRGraph, split_records  # practice/src/csr_graph.py
+
+
+class CSRCurrencyConverter(CurrencyConverter):
+    def __init__(self, rate_string):
+        self._best = {}
+        self._parse_rates(rate_string)
+
+    def _parse_rates(self, rate_string):
+        self.graph = CSRGraph.from_column_chunks(self._rate_blocks(rate_string or ""),
+                                                 [("rate", "d"), ("weight", "d")])
+
+    def _rate_blocks(self, rate_string):
+        for from_codes, to_codes, rate_texts in split_records(rate_string, 3):
+            rates = array("d", map(float, rate_texts))
+            if min(rates) <= 0:
+                bad = next(i for i, rate in enumerate(rates) if rate <= 0)
+                raise ValueError(f"Rate must be positive: {from_codes[bad]}:{to_codes[bad]}:{rate_texts[bad]}")
+
+            # Both directions, like part 5: the quotes, then their inverses.
+            logs = array("d", map(math.log, rates))
+            yield (from_codes + to_codes, to_codes + from_codes,
+                   rates + array("d", map((1.0).__truediv__, rates)),
+                   array("d", map(operator.neg, logs)) + logs)
+
+    def _relax(self, sources):
+        """SPFA from sources over node ids; returns {currency: best rate}. Raises ArbitrageError on a negative cycle."""
+        graph = self.graph
+        n = len(graph)
+        offsets, targets = graph.offsets, graph.targets
+        edge_rates, weights = graph.columns["rate"], graph.columns["weight"]
+        epsilon = self.EPSILON
+
+        dist = [math.inf] * n
+        rate = [0.0] * n
+        parent = [-1] * n
+        hops = [0] * n
+        queued = bytearray(n)
+        ids = [graph.index[code] for code in sources]
+        for node in ids:
+            dist[node], rate[node], queued[node] = 0.0, 1.0, 1
+        queue = deque(ids)
+
+        while queue:
+            current = queue.popleft()
+            queued[current] = 0
+            base, base_rate, base_hops = dist[current], rate[current], hops[current] + 1
+            for e in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[e]
+                candidate = base + weights[e]
+                if candidate < dist[neighbor] - epsilon:
+                    dist[neighbor] = candidate
+                    rate[neighbor] = base_rate * edge_rates[e]
+                    parent[neighbor] = current
+                    hops[neighbor] = base_hops
+                    if base_hops >= n:
+                        error = self._arbitrage(parent, neighbor)
+                        if error is not None:
+                            raise error
+                    if not queued[neighbor]:
+                        queue.append(neighbor)
+                        queued[neighbor] = 1
+
+        nodes = graph.nodes
+        return {nodes[node]: rate[node] for node in range(n) if dist[node] < math.inf}
+
+    def _arbitrage(self, parent, start):
+        # Same walk as part 5, on ids: -1 is a source with no parent yet.
+        seen = set()
+        current = start
+        while current != -1 and current not in seen:
+            seen.add(current)
+            current = parent[current]
+        if current == -1:
+            return None
+        cycle = [current]
+        node = parent[current]
+        while node != current:
+            cycle.append(node)
+            node = parent[node]
+        cycle.append(current)
+        cycle.reverse()
+
+        graph = self.graph
+        edge_rates = graph.columns["rate"]
+        gain = 1.0
+        for a, b in zip(cycle, cycle[1:]):
+            gain *= max(edge_rates[e] for e in graph.edge_range(a) if graph.targets[e] == b)
+        return ArbitrageError([graph.nodes[node] for node in cycle], gain)
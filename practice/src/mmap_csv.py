@@ -0,0 +1,191 @@
+# Memory-mapped CSV reading shared by the practice modules.
+#
+# Most solutions here split the whole input on '\n' and then every line on ','.
+# For large batch files that means holding the file, every line and every field
+# in memory at the same time. MappedCSV maps the file instead and only builds
+# strings for the columns a caller asks for.
+#
+# Usage:
+#
+#   with MappedCSV('practice/data/transaction_data.csv') as reader:
+#       for amount, merchant_id in reader.rows(['amount', 'merchant_id']):
+#           ...
+#
+#   # In-memory input (the interview-style CSV strings) works the same way.
+#   reader = MappedCSV.from_string(csv_data)
+#
+#   # Functions that take "a CSV string or a file" use from_source: a pathlib.Path
+#   # is mapped, a str is the CSV text.
+#   reader = MappedCSV.from_source(source)
+#
+# Importing:
+#
+# Modules import the shared helpers here (mmap_csv, csr_graph, column_codes) by
+# name, so practice/src has to be on the import path. Run them from practice/src:
+#
+#   cd practice/src && PYTHONPATH=. python transaction_fee/transaction.py
+#
+# The benchmark harness adds practice/src itself.
+#
+# Notes:
+#
+# Row boundaries are found with find() on the mapped bytes, so row_views()
+# hands out memoryview slices without copying anything.
+# rows() and columns() decode the file one block at a time and split each line
+# only up to the last requested column. Splitting in C is faster than calling
+# find() once per field from Python, and fields after the last requested column
+# are never turned into strings.
+# Quoted fields are not supported, same as the line.split(',') code it replaces.
+
+import mmap
+import os
+from operator import itemgetter
+
+BLOCK_SIZE = 1 << 20
+
+
+class MappedCSV:
+    """Read-only CSV view over a memory-mapped file or an in-memory buffer."""
+
+    def __init__(self, path=None, has_header=True, encoding='utf-8', _buffer=None):
+        self.encoding = encoding
+        self._file = None
+        self._mmap = None
+        if _buffer is not None:
+            self.buf = _buffer
+        else:
+            self._file = open(path, 'rb')
+            try:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # mmap refuses empty files
+                self._mmap = None
+            self.buf = self._mmap if self._mmap is not None else b''
+
+        self.header = None
+        self.body_start = 0
+        if has_header:
+            end = self.buf.find(b'\n')
+            if end == -1:
+                end = len(self.buf)
+            header = str(self.buf[:end], encoding).rstrip('\r')
+            self.header = [name.strip() for name in header.split(',')] if header else []
+            self.body_start = min(end + 1, len(self.buf))
+
+    @classmethod
+    def from_string(cls, data, has_header=True, encoding='utf-8'):
+        if isinstance(data, str):
+            data = data.encode(encoding)
+        return cls(has_header=has_header, encoding=encoding, _buffer=bytes(data))
+
+    @classmethod
+    def from_source(cls, source, has_header=True, encoding='utf-8'):
+        """Map source if it is an os.PathLike; treat a str or bytes as the CSV text itself.
+
+        The interview-style functions take their input as a CSV string, so a plain str
+        stays data and a file is passed as a pathlib.Path.
+        """
+        if isinstance(source, os.PathLike):
+            return cls(source, has_header=has_header, encoding=encoding)
+        return cls.from_string(source, has_header=has_header, encoding=encoding)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap the file. Any memoryview from row_views() must be released first."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.buf = b''
+
+    def column_index(self, column):
+        """Accept a header name or a plain 0-based index."""
+        if isinstance(column, int):
+            return column
+        if self.header is None:
+            raise ValueError('Column names need a header row; pass indices instead')
+        return self.header.index(column)
+
+    def row_spans(self):
+        """Yield (start, stop) byte offsets of every non-empty row, without '\\r\\n'."""
+        buf = self.buf
+        find = buf.find
+        pos = self.body_start
+        size = len(buf)
+        while pos < size:
+            end = find(b'\n', pos)
+            if end == -1:
+                end = size
+            stop = end
+            if stop > pos and buf[stop - 1] == 13:  # '\r'
+                stop -= 1
+            if stop > pos:
+                yield pos, stop
+            pos = end + 1
+
+    def row_views(self):
+        """Yield a zero-copy memoryview of each row's bytes."""
+        with memoryview(self.buf) as view:
+            for start, stop in self.row_spans():
+                yield view[start:stop]
+
+    def _blocks(self):
+        """Yield decoded chunks of whole lines, about BLOCK_SIZE bytes each."""
+        buf = self.buf
+        pos = self.body_start
+        size = len(buf)
+        while pos < size:
+            end = size
+            if pos + BLOCK_SIZE < size:
+                end = buf.rfind(b'\n', pos, pos + BLOCK_SIZE)
+                if end == -1:
+                    end = buf.find(b'\n', pos + BLOCK_SIZE)
+                    if end == -1:
+                        end = size
+            yield str(buf[pos:end], self.encoding)
+            pos = end + 1
+
+    def rows(self, columns=None):
+        """Yield a tuple of decoded fields per row, only for the requested columns."""
+        if columns is None:
+            for block in self._blocks():
+                for line in block.split('\n'):
+                    line = line.rstrip('\r')
+                    if line:
+                        yield tuple(line.split(','))
+            return
+
+        indices = [self.column_index(column) for column in columns]
+        last = max(indices)
+        pick = itemgetter(*indices)
+        single = len(indices) == 1
+        for block in self._blocks():
+            for line in block.split('\n'):
+                line = line.rstrip('\r')
+                if not line:
+                    continue
+                fields = pick(line.split(',', last + 1))
+                yield (fields,) if single else fields
+
+    def columns(self, columns):
+        """Return one list per requested column (column-major)."""
+        indices = [self.column_index(column) for column in columns]
+        last = max(indices)
+        result = [[] for _ in indices]
+        pairs = list(zip(indices, result))
+        for block in self._blocks():
+            for line in block.split('\n'):
+                line = line.rstrip('\r')
+                if not line:
+                    continue
+                fields = line.split(',', last + 1)
+                for i, column in pairs:
+                    column.append(fields[i])
+        return result
@@ -142,8 +142,65 @@ forgiveness = 5
 reconcile_payment(payment, invoices, forgiveness)
 
 
+# Follow-up: Invoice Files
+# Both versions take the invoices as a list of strings and split every one of them
+# again for each payment. A real invoice book is a file, and a day has many payments.
+# Plan:
+# Load the book once through MappedCSV (practice/src/mmap_csv.py) into
+# {invoice_id: (date, amount)}. A pathlib.Path is memory-mapped and a CSV string
+# still works, via MappedCSV.from_source. Fields are stripped, so "inv-1, 2024-03-15, 100"
+# reads the same as "inv-1,2024-03-15,100".
+# reconcile_payment takes that dict or the old list, and matches with the Part 2 rules.
+# Code:
 
+from mmap_csv import MappedCSV  # practice/src/mmap_csv.py
 
 
+def load_invoices(source, has_header=True):
+    """Return {invoice_id (lowercase): (date, amount)} from an invoice CSV."""
+    invoice_details = {}
+    with MappedCSV.from_source(source, has_header=has_header) as reader:
+        for invoice_id, date, amount in reader.rows([0, 1, 2]):
+            invoice_details[invoice_id.strip().lower()] = (date.strip(), int(amount))
+    return invoice_details
 
 
+def reconcile_payment(payment, invoices, forgiveness=0):
+    invoice_details = invoices if isinstance(invoices, dict) else load_invoices("\n".join(invoices), has_header=False)
+
+    parts = payment.split(",")
+    payment_id = parts[0]
+    payment_amount = int(parts[1])
+    payment_note = ", ".join(parts[2:]).lower()
+
+    found_invoice_id = ""
+    for term in (INVOICE_TERM_1, INVOICE_TERM_2):
+        if term in payment_note:
+            found_invoice_id = payment_note[payment_note.index(term) + len(term):].strip()
+            break
+
+    if found_invoice_id not in invoice_details:
+        sorted_by_date = sorted(invoice_details.items(), key=lambda item: item[1][0])
+        found_invoice_id = next((invoice_id for invoice_id, (_, amount) in sorted_by_date
+                                 if amount == payment_amount), "")
+        if not found_invoice_id:
+            found_invoice_id = next((invoice_id for invoice_id, (_, amount) in sorted_by_date
+                                     if abs(amount - payment_amount) <= forgiveness), "")
+
+    if not found_invoice_id:
+        print(f"Payment {payment_id} could not be matched to any invoice")
+        return
+    print(
+        f"Payment {payment_id} paid {payment_amount} for invoice {found_invoice_id} "
+        f"due on {invoice_details[found_invoice_id][0]}"
+    )
+
+# invoice_book = load_invoices(pathlib.Path("invoices.csv"))
+# for payment in todays_payments:
+#     reconcile_payment(payment, invoice_book, forgiveness)
+
+# Performance:
+# Time Complexity: O(i) once to load the book, then O(i log i) per payment that needs the amount fallback.
+# Space Complexity: O(i) for the dict; the file itself is mapped, not read into a list of strings.
+# Watch Out For:
+# A payment that matches nothing prints "could not be matched" instead of raising KeyError.
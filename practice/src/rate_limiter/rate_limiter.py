@@ -1,6 +1,324 @@
+import asyncio
 import threading
 import bisect
+import hashlib
+import heapq
+import multiprocessing
+import os
+import time
 from collections import defaultdict, deque
+from multiprocessing import shared_memory
+
+
+def _group_by_key(pairs):
+    """Return {key: [(position, timestamp), ...]}, keeping each key's requests in input order."""
+    groups = {}
+    for position, (key, timestamp) in enumerate(pairs):
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [(position, timestamp)]
+        else:
+            group.append((position, timestamp))
+    return groups
+
+
+def _admit_window(hits: deque, group, window_seconds, max_requests, results) -> None:
+    """Run one key's requests through its sliding-window deque, writing outcomes into results."""
+    for position, timestamp in group:
+        window_start = timestamp - window_seconds
+        while hits and hits[0] <= window_start:
+            hits.popleft()
+        if len(hits) < max_requests:
+            hits.append(timestamp)
+            results[position] = True
+
+
+class _Log2Histogram:
+    """Nanosecond durations in power-of-two buckets: bucket i counts values below 2**i ns."""
+
+    __slots__ = ("buckets", "count", "total")
+
+    def __init__(self):
+        self.buckets = [0] * 64
+        self.count = 0
+        self.total = 0
+
+    def observe(self, nanoseconds: int) -> None:
+        self.buckets[nanoseconds.bit_length()] += 1
+        self.count += 1
+        self.total += nanoseconds
+
+    def merge(self, other: "_Log2Histogram") -> None:
+        for i, n in enumerate(list(other.buckets)):
+            self.buckets[i] += n
+        self.count += other.count
+        self.total += other.total
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "sum_ns": self.total,
+                "buckets_ns": {1 << i: n for i, n in enumerate(self.buckets) if n}}
+
+
+class _TimedLock:
+    """Wraps a threading.Lock and records how long each acquire waited."""
+
+    def __init__(self, lock, metrics: "LimiterMetrics"):
+        self._lock = lock
+        self._metrics = metrics
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        start = time.perf_counter_ns()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._metrics.observe_lock_wait(time.perf_counter_ns() - start)
+        return acquired
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+class _ThreadMetrics:
+    """One thread's counters for a LimiterMetrics. Only that thread writes them, so they need no lock."""
+
+    def __init__(self, top_k: int):
+        self.top_k = top_k
+        self.allowed = 0
+        self.rejected = 0
+        self.latency = _Log2Histogram()
+        self.lock_wait = _Log2Histogram()
+        self.heavy = {}  # key -> [requests, rejected, error], at most top_k entries
+        self._by_count = {}  # requests -> set of keys, so the smallest counter is found in O(1)
+        self._min_count = 0
+
+    def count(self, key, allowed: bool) -> None:
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+
+        heavy, by_count = self.heavy, self._by_count
+        entry = heavy.get(key)
+        if entry is None:
+            if len(heavy) < self.top_k:
+                entry = heavy[key] = [0, 0, 0]
+                self._min_count = 1  # after the increment below
+            else:
+                # Space-Saving: the new key takes over the smallest counter.
+                floor = self._min_count
+                victim = by_count[floor].pop()
+                del heavy[victim]
+                entry = heavy[key] = [floor, 0, floor]
+                by_count[floor].add(key)
+
+        count = entry[0]
+        if count:
+            keys = by_count[count]
+            keys.discard(key)
+            if not keys:
+                del by_count[count]
+                if count == self._min_count:
+                    self._min_count = count + 1
+        entry[0] = count + 1
+        keys = by_count.get(count + 1)
+        if keys is None:
+            by_count[count + 1] = {key}
+        else:
+            keys.add(key)
+        if not allowed:
+            entry[1] += 1
+
+
+class LimiterMetrics:
+    """
+    Opt-in instrumentation for a limiter: pass metrics=LimiterMetrics() to its constructor.
+
+    Records allowed/rejected counts, decision latency and lock wait (log2 histograms),
+    the top_k busiest keys (Space-Saving: at most top_k counters, counts may be
+    overestimated by the recorded error), and at export time the live key count and
+    window depths. attach() wraps the limiter instance, so a limiter built without
+    metrics runs exactly the same code as before and pays nothing.
+    Lock wait covers the limiter's shared locks (its lock, global lock or shard locks).
+
+    Each thread records into its own _ThreadMetrics, so recording takes no lock and
+    does not serialize a sharded limiter again. to_dict() merges them; a thread that
+    is still recording may be read mid-update, so a live export can be off by a few
+    requests. Counters of finished threads are kept and still exported.
+    """
+
+    def __init__(self, top_k: int = 10):
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        self.top_k = top_k
+        self.limiter = None
+        self._local = threading.local()
+        self._threads = []  # every recording thread's _ThreadMetrics
+        self._lock = threading.Lock()  # guards _threads; taken once per thread
+
+    def attach(self, limiter) -> None:
+        self.limiter = limiter
+        if getattr(limiter, "lock", None) is not None:
+            limiter.lock = _TimedLock(limiter.lock, self)
+        if getattr(limiter, "global_lock", None) is not None:
+            limiter.global_lock = _TimedLock(limiter.global_lock, self)
+        for shard in getattr(limiter, "shards", ()):
+            shard.lock = _TimedLock(shard.lock, self)
+
+        single, many = limiter.check_and_hit, limiter.check_and_hit_many
+        clock = time.perf_counter_ns
+
+        def check_and_hit(key, timestamp):
+            start = clock()
+            allowed = single(key, timestamp)
+            self.record(key, allowed, clock() - start)
+            return allowed
+
+        def check_and_hit_many(pairs):
+            start = clock()
+            results = many(pairs)
+            self.record_many(pairs, results, clock() - start)
+            return results
+
+        limiter.check_and_hit = check_and_hit
+        limiter.check_and_hit_many = check_and_hit_many
+
+    def _mine(self) -> _ThreadMetrics:
+        try:
+            return self._local.metrics
+        except AttributeError:
+            mine = self._local.metrics = _ThreadMetrics(self.top_k)
+            with self._lock:
+                self._threads.append(mine)
+            return mine
+
+    def observe_lock_wait(self, nanoseconds: int) -> None:
+        self._mine().lock_wait.observe(nanoseconds)
+
+    def record(self, key, allowed: bool, nanoseconds: int) -> None:
+        mine = self._mine()
+        mine.latency.observe(nanoseconds)
+        mine.count(key, allowed)
+
+    def record_many(self, pairs, results, nanoseconds: int) -> None:
+        """One latency sample per request, each charged an equal share of the batch."""
+        if not pairs:
+            return
+        share = nanoseconds // len(pairs)
+        mine = self._mine()
+        observe, count = mine.latency.observe, mine.count
+        for (key, _), allowed in zip(pairs, results):
+            observe(share)
+            count(key, allowed)
+
+    def _top_keys(self, threads) -> list:
+        """Merge the per-thread Space-Saving summaries into the top_k keys, busiest first.
+
+        A key missing from a full summary may still have up to that summary's
+        smallest count there, so it is charged that much as both requests and error:
+        the merged counts stay overestimates bounded by their error, like one summary's.
+        """
+        floor_total = 0
+        merged = {}  # key -> [requests - floor_total, rejected, error - floor_total]
+        for thread in threads:
+            heavy = [(key, tuple(entry)) for key, entry in list(thread.heavy.items())]
+            floor = min(entry[0] for _, entry in heavy) if len(heavy) >= self.top_k else 0
+            floor_total += floor
+            for key, (n, rejected, error) in heavy:
+                totals = merged.setdefault(key, [0, 0, 0])
+                totals[0] += n - floor
+                totals[1] += rejected
+                totals[2] += error - floor
+        top = sorted(merged.items(), key=lambda item: -item[1][0])[:self.top_k]
+        return [(key, n + floor_total, rejected, error + floor_total) for key, (n, rejected, error) in top]
+
+    def _depths(self) -> list:
+        """Per-key window sizes for the limiters that keep one; empty otherwise."""
+        limiter = self.limiter
+        # list() over a dict view runs in C without releasing the GIL, so no lock is needed.
+        if hasattr(limiter, "shards"):
+            return [len(hits) for shard in limiter.shards for hits in list(shard.hits.values())]
+        if isinstance(getattr(limiter, "hits", None), dict):
+            return [len(hits) for hits in list(limiter.hits.values())]
+        return []
+
+    def _live_keys(self) -> int:
+        limiter = self.limiter
+        if hasattr(limiter, "shards"):
+            return sum(len(shard.hits) for shard in limiter.shards)
+        for name in ("hits", "buckets", "tat", "windows"):
+            if isinstance(getattr(limiter, name, None), dict):
+                return len(getattr(limiter, name))
+        return 0
+
+    def to_dict(self) -> dict:
+        depths = self._depths()
+        full_set_denials = getattr(self.limiter, "full_set_denials", None)
+        with self._lock:
+            threads = list(self._threads)
+        latency, lock_wait = _Log2Histogram(), _Log2Histogram()
+        for thread in threads:
+            latency.merge(thread.latency)
+            lock_wait.merge(thread.lock_wait)
+        data = {
+            "allowed": sum(thread.allowed for thread in threads),
+            "rejected": sum(thread.rejected for thread in threads),
+            "decision_latency": latency.to_dict(),
+            "lock_wait": lock_wait.to_dict(),
+            "top_keys": [{"key": key, "requests": n, "rejected": rejected, "error": error}
+                         for key, n, rejected, error in self._top_keys(threads)],
+            "live_keys": self._live_keys(),
+            "max_depth": max(depths, default=0),
+            "total_depth": sum(depths),
+        }
+        if full_set_denials is not None:
+            data["full_set_denials"] = full_set_denials
+        return data
+
+    def to_prometheus(self, prefix: str = "rate_limiter") -> str:
+        """Prometheus text exposition format."""
+        data = self.to_dict()
+        lines = [
+            f"# HELP {prefix}_decisions_total Requests decided by the limiter.",
+            f"# TYPE {prefix}_decisions_total counter",
+            f'{prefix}_decisions_total{{result="allowed"}} {data["allowed"]}',
+            f'{prefix}_decisions_total{{result="rejected"}} {data["rejected"]}',
+        ]
+        for name, help_text in (("decision_latency", "Time spent in check_and_hit."),
+                                ("lock_wait", "Time spent waiting for limiter locks.")):
+            histogram = data[name]
+            metric = f"{prefix}_{name}_seconds"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+            cumulative = 0
+            for upper_ns, n in histogram["buckets_ns"].items():
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{upper_ns / 1e9:g}"}} {cumulative}')
+            lines += [f'{metric}_bucket{{le="+Inf"}} {histogram["count"]}',
+                      f"{metric}_sum {histogram['sum_ns'] / 1e9:g}",
+                      f"{metric}_count {histogram['count']}"]
+
+        for name, help_text in (("live_keys", "Keys currently tracked."),
+                                ("max_depth", "Largest per-key window."),
+                                ("total_depth", "Timestamps held across all keys.")):
+            lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} gauge",
+                      f"{prefix}_{name} {data[name]}"]
+
+        if "full_set_denials" in data:
+            lines += [f"# HELP {prefix}_full_set_denials_total Requests rejected because the key table set was full.",
+                      f"# TYPE {prefix}_full_set_denials_total counter",
+                      f"{prefix}_full_set_denials_total {data['full_set_denials']}"]
+
+        lines += [f"# HELP {prefix}_top_key_requests Requests for the busiest keys (Space-Saving estimate).",
+                  f"# TYPE {prefix}_top_key_requests gauge"]
+        for entry in data["top_keys"]:
+            label = str(entry["key"]).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            lines.append(f'{prefix}_top_key_requests{{key="{label}"}} {entry["requests"]}')
+        return "\n".join(lines) + "\n"
 
 
 class SlidingWindowRateLimiter:
@@ -24,9 +342,9 @@ class SlidingWindowRateLimiter:
             del self.hits[key]
 
     def hit(self, key: str, timestamp: int) -> None:
+        self._cleanup(key, timestamp)
         if key not in self.hits:
             self.hits[key] = deque()
-        self._cleanup(key, timestamp)
         self.hits[key].append(timestamp)
 
     def allowed(self, key: str, timestamp: int) -> bool:
@@ -40,13 +358,21 @@ class RobustRateLimiter:
     """
     Handles out-of-order timestamps using binary search (bisect).
     Also implements 'check_and_hit' to prevent race conditions.
+    Idle keys are dropped by evict_expired (see IdleKeyEvictor).
     """
 
-    def __init__(self, max_requests: int, window_seconds: int):
+    def __init__(self, max_requests: int, window_seconds: int, metrics: "LimiterMetrics" = None):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.hits = defaultdict(list)
+        # A plain dict: a key exists only once check_and_hit has scheduled its expiry,
+        # so reading hits[key] for an unknown key raises instead of leaking a key.
+        self.hits = {}
         self.lock = threading.Lock()
+        self.expiry = []  # min-heap of (time the key may expire, key)
+        self.evictions = 0
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.attach(self)
 
     def _cleanup(self, key: str, timestamp: int) -> None:
         window_start = timestamp - self.window_seconds
@@ -58,6 +384,9 @@ class RobustRateLimiter:
     def check_and_hit(self, key: str, timestamp: int) -> bool:
         """Atomic check-and-record operation."""
         with self.lock:
+            if key not in self.hits:
+                self.hits[key] = []
+                heapq.heappush(self.expiry, (timestamp + self.window_seconds, key))
             self._cleanup(key, timestamp)
             if len(self.hits[key]) < self.max_requests:
                 # Use insort to handle out-of-order timestamps
@@ -65,43 +394,810 @@ class RobustRateLimiter:
                 return True
             return False
 
+    def check_and_hit_many(self, pairs) -> list:
+        """check_and_hit for a batch of (key, timestamp) pairs under one lock acquisition."""
+        results = [False] * len(pairs)
+        with self.lock:
+            for key, group in _group_by_key(pairs).items():
+                hits = self.hits.get(key)
+                if hits is None:
+                    hits = self.hits[key] = []
+                    heapq.heappush(self.expiry, (group[0][1] + self.window_seconds, key))
+
+                # hits[:start] has expired. Track the offset instead of slicing
+                # per request, and drop the prefix once at the end.
+                start = 0
+                for position, timestamp in group:
+                    start = bisect.bisect_right(hits, timestamp - self.window_seconds, start)
+                    if len(hits) - start < self.max_requests:
+                        bisect.insort(hits, timestamp, start)
+                        results[position] = True
+                if start:
+                    del hits[:start]
+        return results
+
+    def evict_expired(self, now: int) -> int:
+        """Drop keys whose newest hit is a full window older than now."""
+        evicted = 0
+        with self.lock:
+            while self.expiry and self.expiry[0][0] <= now:
+                _, key = heapq.heappop(self.expiry)
+                hits = self.hits.get(key)
+                if hits is None:
+                    continue
+                if hits and hits[-1] + self.window_seconds > now:
+                    # Still active: check again when its newest hit expires.
+                    heapq.heappush(self.expiry, (hits[-1] + self.window_seconds, key))
+                    continue
+                del self.hits[key]
+                evicted += 1
+            self.evictions += evicted
+        return evicted
+
+    def eviction_stats(self) -> dict:
+        with self.lock:
+            return {"live_keys": len(self.hits), "evictions": self.evictions, "scheduled": len(self.expiry)}
+
+
+class _SortedWindow:
+    """
+    Sorted timestamps kept in blocks of at most 2 * LOAD (the sortedcontainers layout).
+    Insert bisects the block maxes, then insorts into one small block, so a late
+    timestamp shifts at most 2 * LOAD items instead of the whole window.
+    Expiry drops whole blocks, then trims the first one.
+    """
+
+    __slots__ = ("blocks", "maxes", "size")
+    LOAD = 256
+
+    def __init__(self):
+        self.blocks = []  # sorted lists, each block entirely <= the next
+        self.maxes = []   # last item of each block
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+    def __getitem__(self, index: int):
+        if index == -1 and self.blocks:
+            return self.maxes[-1]
+        if index < 0:
+            index += self.size
+        for block in self.blocks:
+            if index < len(block):
+                return block[index]
+            index -= len(block)
+        raise IndexError("index out of range")
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def add(self, timestamp) -> None:
+        blocks, maxes = self.blocks, self.maxes
+        if not blocks:
+            blocks.append([timestamp])
+            maxes.append(timestamp)
+            self.size = 1
+            return
+
+        i = bisect.bisect_right(maxes, timestamp)
+        if i == len(maxes):
+            # Newest so far (the common case): append to the last block.
+            i -= 1
+            blocks[i].append(timestamp)
+            maxes[i] = timestamp
+        else:
+            bisect.insort(blocks[i], timestamp)
+        self.size += 1
+
+        block = blocks[i]
+        if len(block) > 2 * self.LOAD:
+            tail = block[self.LOAD:]
+            del block[self.LOAD:]
+            blocks.insert(i + 1, tail)
+            maxes[i] = block[-1]
+            maxes.insert(i + 1, tail[-1])
+
+    def drop_through(self, cutoff) -> None:
+        """Remove every timestamp <= cutoff."""
+        blocks, maxes = self.blocks, self.maxes
+        expired = bisect.bisect_right(maxes, cutoff)
+        if expired:
+            self.size -= sum(len(block) for block in blocks[:expired])
+            del blocks[:expired]
+            del maxes[:expired]
+        if blocks:
+            # maxes[0] > cutoff, so the first block is never emptied here.
+            stale = bisect.bisect_right(blocks[0], cutoff)
+            if stale:
+                del blocks[0][:stale]
+                self.size -= stale
+
+
+class OutOfOrderRateLimiter(RobustRateLimiter):
+    """
+    Same semantics as RobustRateLimiter, for windows that hold many requests.
+    RobustRateLimiter copies the list on every cleanup and insort shifts every
+    newer timestamp, so large windows with late events go quadratic. Here each
+    key's window is a _SortedWindow: O(log n + LOAD) inserts and expiry that
+    drops whole blocks.
+    """
+
+    def __init__(self, max_requests: int, window_seconds: int, metrics: "LimiterMetrics" = None):
+        super().__init__(max_requests, window_seconds, metrics)
+
+    def _cleanup(self, key: str, timestamp: int) -> None:
+        self.hits[key].drop_through(timestamp - self.window_seconds)
+
+    def check_and_hit(self, key: str, timestamp: int) -> bool:
+        with self.lock:
+            window = self.hits.get(key)
+            if window is None:
+                window = self.hits[key] = _SortedWindow()
+                heapq.heappush(self.expiry, (timestamp + self.window_seconds, key))
+            window.drop_through(timestamp - self.window_seconds)
+            if len(window) < self.max_requests:
+                window.add(timestamp)
+                return True
+            return False
+
+    def check_and_hit_many(self, pairs) -> list:
+        """check_and_hit for a batch of (key, timestamp) pairs under one lock acquisition."""
+        results = [False] * len(pairs)
+        with self.lock:
+            for key, group in _group_by_key(pairs).items():
+                window = self.hits.get(key)
+                if window is None:
+                    window = self.hits[key] = _SortedWindow()
+                    heapq.heappush(self.expiry, (group[0][1] + self.window_seconds, key))
+                for position, timestamp in group:
+                    window.drop_through(timestamp - self.window_seconds)
+                    if len(window) < self.max_requests:
+                        window.add(timestamp)
+                        results[position] = True
+        return results
+
 
 class ThreadSafeRateLimiter:
     """
     Thread-safe implementation using per-key locking for high concurrency.
+    Idle keys are dropped by evict_expired (see IdleKeyEvictor).
     """
 
-    def __init__(self, max_requests: int, window_seconds: int):
+    def __init__(self, max_requests: int, window_seconds: int, metrics: "LimiterMetrics" = None):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
         self.hits = {}
         self.locks = {}
         self.global_lock = threading.Lock()
+        self.expiry = []  # min-heap of (time the key may expire, key), guarded by global_lock
+        self.evictions = 0
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.attach(self)
 
-    def _get_lock(self, key: str) -> threading.Lock:
+    def _get_lock(self, key: str, timestamp: int) -> threading.Lock:
         with self.global_lock:
             if key not in self.locks:
                 self.locks[key] = threading.Lock()
+                heapq.heappush(self.expiry, (timestamp + self.window_seconds, key))
             return self.locks[key]
 
     def check_and_hit(self, key: str, timestamp: int) -> bool:
-        lock = self._get_lock(key)
-        with lock:
-            # Re-check key existence under lock
-            if key not in self.hits:
-                self.hits[key] = deque()
+        while True:
+            lock = self._get_lock(key, timestamp)
+            with lock:
+                # The key may have been evicted while we waited; retry with its new lock.
+                if self.locks.get(key) is not lock:
+                    continue
+
+                # Re-check key existence under lock
+                if key not in self.hits:
+                    self.hits[key] = deque()
+
+                # Cleanup
+                window_start = timestamp - self.window_seconds
+                while self.hits[key] and self.hits[key][0] <= window_start:
+                    self.hits[key].popleft()
+
+                # Logic
+                if len(self.hits[key]) < self.max_requests:
+                    self.hits[key].append(timestamp)
+                    return True
+                return False
+
+    def check_and_hit_many(self, pairs) -> list:
+        """check_and_hit for a batch of (key, timestamp) pairs, taking each key's lock once."""
+        results = [False] * len(pairs)
+        for key, group in _group_by_key(pairs).items():
+            while True:
+                lock = self._get_lock(key, group[0][1])
+                with lock:
+                    if self.locks.get(key) is not lock:
+                        continue
+                    hits = self.hits.get(key)
+                    if hits is None:
+                        hits = self.hits[key] = deque()
+                    _admit_window(hits, group, self.window_seconds, self.max_requests, results)
+                    break
+        return results
+
+    def evict_expired(self, now: int) -> int:
+        """Drop keys (and their locks) whose newest hit is a full window older than now."""
+        evicted = 0
+        with self.global_lock:
+            while self.expiry and self.expiry[0][0] <= now:
+                _, key = heapq.heappop(self.expiry)
+                lock = self.locks.get(key)
+                if lock is None:
+                    continue
+                # Never wait on a key lock while holding global_lock; a busy key is not idle.
+                if not lock.acquire(blocking=False):
+                    heapq.heappush(self.expiry, (now + self.window_seconds, key))
+                    continue
+                try:
+                    hits = self.hits.get(key)
+                    if hits and hits[-1] + self.window_seconds > now:
+                        heapq.heappush(self.expiry, (hits[-1] + self.window_seconds, key))
+                        continue
+                    self.hits.pop(key, None)
+                    del self.locks[key]
+                    evicted += 1
+                finally:
+                    lock.release()
+            self.evictions += evicted
+        return evicted
+
+    def eviction_stats(self) -> dict:
+        with self.global_lock:
+            return {"live_keys": len(self.locks), "evictions": self.evictions, "scheduled": len(self.expiry)}
+
+
+class _Shard:
+    __slots__ = ("lock", "hits", "expiry")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = {}     # key -> deque of timestamps
+        self.expiry = []   # min-heap of (time the key may expire, key)
+
+
+class ShardedRateLimiter:
+    """
+    Sliding window split into num_shards independent shards picked by hash(key).
+    Each shard has its own lock and state, so there is no global critical section:
+    two requests only contend when their keys land in the same shard.
+    """
+
+    def __init__(self, max_requests: int, window_seconds: int, num_shards: int = 64,
+                 metrics: "LimiterMetrics" = None):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.num_shards = num_shards
+        self.shards = [_Shard() for _ in range(num_shards)]
+        self.evictions = 0
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.attach(self)
+
+    def _shard(self, key: str) -> _Shard:
+        return self.shards[hash(key) % self.num_shards]
+
+    def check_and_hit(self, key: str, timestamp: int) -> bool:
+        shard = self._shard(key)
+        with shard.lock:
+            hits = shard.hits.get(key)
+            if hits is None:
+                hits = shard.hits[key] = deque()
+                heapq.heappush(shard.expiry, (timestamp + self.window_seconds, key))
 
-            # Cleanup
             window_start = timestamp - self.window_seconds
-            while self.hits[key] and self.hits[key][0] <= window_start:
-                self.hits[key].popleft()
+            while hits and hits[0] <= window_start:
+                hits.popleft()
 
-            # Logic
-            if len(self.hits[key]) < self.max_requests:
-                self.hits[key].append(timestamp)
+            if len(hits) < self.max_requests:
+                hits.append(timestamp)
                 return True
             return False
 
+    def check_and_hit_many(self, pairs) -> list:
+        """check_and_hit for a batch of (key, timestamp) pairs, taking each shard's lock once."""
+        results = [False] * len(pairs)
+        by_shard = defaultdict(list)
+        for key, group in _group_by_key(pairs).items():
+            by_shard[hash(key) % self.num_shards].append((key, group))
+
+        for index, groups in by_shard.items():
+            shard = self.shards[index]
+            with shard.lock:
+                for key, group in groups:
+                    hits = shard.hits.get(key)
+                    if hits is None:
+                        hits = shard.hits[key] = deque()
+                        heapq.heappush(shard.expiry, (group[0][1] + self.window_seconds, key))
+                    _admit_window(hits, group, self.window_seconds, self.max_requests, results)
+        return results
+
+    def evict_expired(self, now: int) -> int:
+        """Drop idle keys, one shard lock at a time."""
+        evicted = 0
+        for shard in self.shards:
+            with shard.lock:
+                while shard.expiry and shard.expiry[0][0] <= now:
+                    _, key = heapq.heappop(shard.expiry)
+                    hits = shard.hits.get(key)
+                    if hits is None:
+                        continue
+                    if hits and hits[-1] + self.window_seconds > now:
+                        heapq.heappush(shard.expiry, (hits[-1] + self.window_seconds, key))
+                        continue
+                    del shard.hits[key]
+                    evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def eviction_stats(self) -> dict:
+        live_keys = scheduled = 0
+        for shard in self.shards:
+            with shard.lock:
+                live_keys += len(shard.hits)
+                scheduled += len(shard.expiry)
+        return {"live_keys": live_keys, "evictions": self.evictions, "scheduled": scheduled}
+
+
+class TokenBucketRateLimiter:
+    """
+    Token bucket with O(1) memory per key.
+    Each key holds up to max_requests tokens, refilled at max_requests / window_seconds
+    per second. Allows the same long-run rate as the sliding window, with bursts up to
+    max_requests.
+    """
+
+    def __init__(self, max_requests: int, window_seconds: int, metrics: "LimiterMetrics" = None):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.refill_rate = max_requests / window_seconds
+        self.buckets = {}  # key -> [tokens, last_timestamp]
+        self.lock = threading.Lock()
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.attach(self)
+
+    def _take(self, bucket: list, timestamp: int) -> bool:
+        # Late timestamps do not refill, and do not move the clock back.
+        elapsed = timestamp - bucket[1]
+        if elapsed > 0:
+            bucket[0] = min(self.max_requests, bucket[0] + elapsed * self.refill_rate)
+            bucket[1] = timestamp
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True
+        return False
+
+    def check_and_hit(self, key: str, timestamp: int) -> bool:
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [self.max_requests, timestamp]
+            return self._take(bucket, timestamp)
+
+    def check_and_hit_many(self, pairs) -> list:
+        """check_and_hit for a batch of (key, timestamp) pairs under one lock acquisition."""
+        results = [False] * len(pairs)
+        with self.lock:
+            for key, group in _group_by_key(pairs).items():
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    bucket = self.buckets[key] = [self.max_requests, group[0][1]]
+                # Same steps as _take, on locals; the bucket is written back once per key.
+                tokens, last = bucket
+                for position, timestamp in group:
+                    if timestamp > last:
+                        tokens = min(self.max_requests, tokens + (timestamp - last) * self.refill_rate)
+                        last = timestamp
+                    if tokens >= 1:
+                        tokens -= 1
+                        results[position] = True
+                bucket[0], bucket[1] = tokens, last
+        return results
+
+
+class GCRARateLimiter:
+    """
+    Generic Cell Rate Algorithm: one number per key (the theoretical arrival time).
+    Requests are spaced window_seconds / max_requests apart, with a burst
+    tolerance of max_requests. Equivalent to a token bucket without the refill math.
+    """
+
+    def __init__(self, max_requests: int, window_seconds: int, metrics: "LimiterMetrics" = None):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        # Time is kept scaled by max_requests so the emission interval is exactly
+        # window_seconds and integer timestamps never hit float rounding.
+        self.burst_span = window_seconds * max_requests
+        self.tat = {}  # key -> scaled theoretical arrival time of the next request
+        self.lock = threading.Lock()
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.attach(self)
+
+    def check_and_hit(self, key: str, timestamp: int) -> bool:
+        now = timestamp * self.max_requests
+        with self.lock:
+            new_tat = max(self.tat.get(key, now), now) + self.window_seconds
+            if new_tat - now > self.burst_span:
+                return False
+            self.tat[key] = new_tat
+            return True
+
+    def check_and_hit_many(self, pairs) -> list:
+        """check_and_hit for a batch of (key, timestamp) pairs under one lock acquisition."""
+        results = [False] * len(pairs)
+        scale = self.max_requests
+        with self.lock:
+            for key, group in _group_by_key(pairs).items():
+                tat = self.tat.get(key)
+                for position, timestamp in group:
+                    now = timestamp * scale
+                    new_tat = (now if tat is None or tat < now else tat) + self.window_seconds
+                    if new_tat - now <= self.burst_span:
+                        tat = new_tat
+                        results[position] = True
+                if tat is not None:
+                    self.tat[key] = tat
+        return results
+
+
+class SlidingWindowCounterRateLimiter:
+    """
+    Sliding window approximation with two counters per key.
+    The previous fixed window's count is weighted by how much of it still
+    overlaps the sliding window. O(1) memory, may be off by a few requests
+    at window boundaries compared to the exact deque version.
+    """
+
+    def __init__(self, max_requests: int, window_seconds: int, metrics: "LimiterMetrics" = None):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.windows = {}  # key -> [window_index, current_count, previous_count]
+        self.lock = threading.Lock()
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.attach(self)
+
+    def _count(self, state: list, timestamp: int) -> bool:
+        index, offset = divmod(timestamp, self.window_seconds)
+        if index > state[0]:
+            # Roll forward; anything older than one window counts as zero.
+            state[2] = state[1] if index == state[0] + 1 else 0
+            state[1] = 0
+            state[0] = index
+        elif index < state[0]:
+            # Too late to be counted in the current window; check against it anyway.
+            offset = 0
+
+        overlap = 1 - offset / self.window_seconds
+        if state[2] * overlap + state[1] < self.max_requests:
+            state[1] += 1
+            return True
+        return False
+
+    def check_and_hit(self, key: str, timestamp: int) -> bool:
+        with self.lock:
+            state = self.windows.get(key)
+            if state is None:
+                state = self.windows[key] = [timestamp // self.window_seconds, 0, 0]
+            return self._count(state, timestamp)
+
+    def check_and_hit_many(self, pairs) -> list:
+        """check_and_hit for a batch of (key, timestamp) pairs under one lock acquisition."""
+        results = [False] * len(pairs)
+        with self.lock:
+            for key, group in _group_by_key(pairs).items():
+                state = self.windows.get(key)
+                if state is None:
+                    state = self.windows[key] = [group[0][1] // self.window_seconds, 0, 0]
+                for position, timestamp in group:
+                    results[position] = self._count(state, timestamp)
+        return results
+
+
+class SharedMemoryRateLimiter:
+    """
+    Sliding window shared by every process on the host.
+    State lives in one multiprocessing.shared_memory block, so N worker processes
+    enforce one limit instead of N. Create it in the parent and pass it to the
+    workers (it pickles to the block name plus the locks); they attach on unpickle.
+
+    Layout: `slots` entries grouped into sets of `ways`. A key maps to a set by a
+    64-bit blake2b fingerprint (hash() differs per process), and takes a free or
+    expired way in that set. Each slot has an int64 header (fingerprint, head,
+    count) and a float64 ring buffer of max_requests timestamps. Sets are guarded
+    by `stripes` multiprocessing locks (pass mp_context when workers are not
+    started with the default start method).
+
+    Like ThreadSafeRateLimiter, each key expects its timestamps roughly in order
+    (e.g. time.time() from every worker). A live key is never evicted: when every
+    way in a set still has a hit inside the window, a new key for that set is
+    rejected and counted in full_set_denials (also exported by LimiterMetrics).
+    Evicting instead would let a flood of new keys reset the limits of real ones.
+    Size slots for the number of keys active within one window.
+    """
+
+    FIELDS = 3  # fingerprint, head, count
+
+    def __init__(self, max_requests: int, window_seconds: float, slots: int = 4096, ways: int = 8,
+                 stripes: int = 64, name: str = None, mp_context=None):
+        if max_requests < 1:
+            raise ValueError("max_requests must be at least 1")
+        if slots % ways:
+            raise ValueError("slots must be a multiple of ways")
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.slots = slots
+        self.ways = ways
+        self.sets = slots // ways
+        # Locks must come from the same start-method context as the worker processes.
+        context = mp_context or multiprocessing
+        self.locks = [context.Lock() for _ in range(min(stripes, self.sets))]
+        # Slots, then one full-set denial counter per set.
+        size = (slots * (self.FIELDS + max_requests) + self.sets) * 8
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.owner_pid = os.getpid()  # forked children inherit the object but must not unlink
+        self._attach()
+
+    def _attach(self) -> None:
+        split = self.slots * self.FIELDS * 8
+        self.header = self.shm.buf[:split].cast("q")
+        end = self.slots * (self.FIELDS + self.max_requests) * 8
+        self.ring = self.shm.buf[split:end].cast("d")
+        self.denials = self.shm.buf[end:end + self.sets * 8].cast("q")
+
+    def __getstate__(self):
+        return {
+            "max_requests": self.max_requests, "window_seconds": self.window_seconds,
+            "slots": self.slots, "ways": self.ways, "sets": self.sets,
+            "locks": self.locks, "name": self.shm.name,
+        }
+
+    def __setstate__(self, state):
+        name = state.pop("name")
+        self.__dict__.update(state)
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.owner_pid = None
+        self._attach()
+
+    def close(self) -> None:
+        """Detach this process. The owner also frees the block."""
+        if self.shm is None:
+            return
+        self.header.release()
+        self.ring.release()
+        self.denials.release()
+        self.shm.close()
+        if self.owner_pid == os.getpid():
+            self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _fingerprint(key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little", signed=True) or 1  # 0 marks a free slot
+
+    @property
+    def full_set_denials(self) -> int:
+        """Requests rejected because their key's set had no free or expired way, across all processes."""
+        return sum(self.denials)
+
+    def _slot(self, fingerprint: int, set_index: int, timestamp: float) -> int:
+        """Find the key's slot in its set, or claim a free or expired one; -1 if the set is full.
+
+        Caller holds the set's lock.
+        """
+        header, ring, width = self.header, self.ring, self.max_requests
+        base = set_index * self.ways
+        window_start = timestamp - self.window_seconds
+        victim = -1
+        for slot in range(base, base + self.ways):
+            h = slot * self.FIELDS
+            if header[h] == fingerprint:
+                return slot
+            if victim != -1:
+                continue
+            count = header[h + 2]
+            if header[h] == 0 or count == 0:
+                victim = slot
+            elif ring[slot * width + (header[h + 1] + count - 1) % width] <= window_start:
+                victim = slot  # newest hit has left the window, so the key holds nothing
+
+        if victim == -1:
+            return -1
+        h = victim * self.FIELDS
+        header[h] = fingerprint
+        header[h + 1] = 0
+        header[h + 2] = 0
+        return victim
+
+    def _admit(self, slot: int, timestamp: float) -> bool:
+        header, ring, width = self.header, self.ring, self.max_requests
+        h = slot * self.FIELDS
+        head, count = header[h + 1], header[h + 2]
+        base = slot * width
+        window_start = timestamp - self.window_seconds
+        while count and ring[base + head] <= window_start:
+            head = (head + 1) % width
+            count -= 1
+
+        allowed = count < width
+        if allowed:
+            ring[base + (head + count) % width] = timestamp
+            count += 1
+        header[h + 1] = head
+        header[h + 2] = count
+        return allowed
+
+    def check_and_hit(self, key: str, timestamp: float) -> bool:
+        fingerprint = self._fingerprint(key)
+        set_index = fingerprint % self.sets
+        with self.locks[set_index % len(self.locks)]:
+            slot = self._slot(fingerprint, set_index, timestamp)
+            if slot == -1:
+                self.denials[set_index] += 1
+                return False
+            return self._admit(slot, timestamp)
+
+    def check_and_hit_many(self, pairs) -> list:
+        """check_and_hit for a batch of (key, timestamp) pairs, taking each key's stripe once."""
+        results = [False] * len(pairs)
+        for key, group in _group_by_key(pairs).items():
+            fingerprint = self._fingerprint(key)
+            set_index = fingerprint % self.sets
+            with self.locks[set_index % len(self.locks)]:
+                slot = self._slot(fingerprint, set_index, group[0][1])
+                if slot == -1:
+                    # Stays False; a set that is full at the first timestamp is treated as full for the batch.
+                    self.denials[set_index] += len(group)
+                    continue
+                for position, timestamp in group:
+                    results[position] = self._admit(slot, timestamp)
+        return results
+
+
+class AsyncRateLimiter:
+    """
+    Sliding window for asyncio code, timed by the event loop clock.
+    State is only touched on the loop thread and never across an await, so
+    there is no lock and nothing blocks the loop. acquire() waits for a free
+    slot instead of rejecting; waiters on the same key are served in FIFO order.
+    """
+
+    def __init__(self, max_requests: int, window_seconds: float):
+        if max_requests < 1:
+            raise ValueError("max_requests must be at least 1")
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.hits = {}      # key -> deque of timestamps
+        self.waiters = {}   # key -> deque of futures, oldest first
+        self._timers = {}   # key -> TimerHandle for the next wake-up
+
+    def _try_hit(self, key: str, now: float) -> bool:
+        hits = self.hits.get(key)
+        if hits is None:
+            hits = self.hits[key] = deque()
+        window_start = now - self.window_seconds
+        while hits and hits[0] <= window_start:
+            hits.popleft()
+        if len(hits) < self.max_requests:
+            hits.append(now)
+            return True
+        return False
+
+    async def check_and_hit(self, key: str, timestamp: float = None) -> bool:
+        if timestamp is None:
+            timestamp = asyncio.get_running_loop().time()
+        # Callers queued in acquire() were first; don't let a check jump the queue.
+        if self.waiters.get(key):
+            return False
+        return self._try_hit(key, timestamp)
+
+    async def acquire(self, key: str) -> None:
+        """Wait until a request for key is allowed, then record it."""
+        loop = asyncio.get_running_loop()
+        if not self.waiters.get(key) and self._try_hit(key, loop.time()):
+            return
+
+        waiter = loop.create_future()
+        self.waiters.setdefault(key, deque()).append(waiter)
+        self._schedule_wake(key, loop)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just before we were cancelled: give the slot back.
+                hits = self.hits.get(key)
+                if hits is not None and waiter.result() in hits:
+                    hits.remove(waiter.result())
+                self._schedule_wake(key, loop, now=True)
+            raise
+
+    def _schedule_wake(self, key: str, loop, now: bool = False) -> None:
+        if key in self._timers:
+            if not now:
+                return
+            self._timers.pop(key).cancel()
+        hits = self.hits.get(key)
+        when = loop.time() if now or not hits else hits[0] + self.window_seconds
+        self._timers[key] = loop.call_at(when, self._wake, key, when, loop)
+
+    def _wake(self, key: str, when: float, loop) -> None:
+        self._timers.pop(key, None)
+        # call_at may fire up to one clock tick early; the slot is free by `when`.
+        now = max(loop.time(), when)
+        waiters = self.waiters.get(key)
+        while waiters:
+            waiter = waiters[0]
+            if waiter.done():  # cancelled while queued
+                waiters.popleft()
+                continue
+            if not self._try_hit(key, now):
+                break
+            waiters.popleft()
+            waiter.set_result(now)
+
+        if waiters:
+            self._schedule_wake(key, loop)
+        else:
+            self.waiters.pop(key, None)
+
+
+class IdleKeyEvictor:
+    """
+    Background thread that calls limiter.evict_expired(clock()) every interval seconds.
+    clock must return time in the same units as the timestamps passed to check_and_hit.
+    """
+
+    def __init__(self, limiter, interval: float = 1.0, clock=time.time):
+        self.limiter = limiter
+        self.interval = interval
+        self.clock = clock
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="idle-key-evictor", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.limiter.evict_expired(self.clock())
+
+    def start(self) -> "IdleKeyEvictor":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _shared_memory_worker(limiter, key, attempts, results):
+    allowed = sum(limiter.check_and_hit(key, 1.0) for _ in range(attempts))
+    limiter.close()
+    results.put(allowed)
+
 
 # --- Testing Script ---
 if __name__ == "__main__":
@@ -119,4 +1215,72 @@ if __name__ == "__main__":
     robust.check_and_hit("user_2", 10)
     robust.check_and_hit("user_2", 5)  # Arrived late
     print(f"Hits for user_2: {robust.hits['user_2']}")  # [5, 10]
-    print(f"Allowed at t=11: {robust.check_and_hit('user_2', 11)}")  # False
\ No newline at end of file
+    print(f"Allowed at t=11: {robust.check_and_hit('user_2', 11)}")  # False
+
+    out_of_order = OutOfOrderRateLimiter(max_requests=2, window_seconds=10)
+    out_of_order.check_and_hit("user_2", 10)
+    out_of_order.check_and_hit("user_2", 5)  # Arrived late
+    print(f"OutOfOrderRateLimiter hits: {out_of_order.hits['user_2']}")  # [5, 10]
+    print(f"Allowed at t=11: {out_of_order.check_and_hit('user_2', 11)}")  # False
+
+    print("\n--- Testing Constant-Memory Limiters ---")
+    for limiter_cls in (TokenBucketRateLimiter, GCRARateLimiter, SlidingWindowCounterRateLimiter):
+        limiter = limiter_cls(max_requests=3, window_seconds=10)
+        burst = [limiter.check_and_hit("user_3", 1) for _ in range(4)]
+        later = limiter.check_and_hit("user_3", 20)
+        print(f"{limiter_cls.__name__}: burst {burst}, t=20 {later}")  # [True, True, True, False], True
+
+    print("\n--- Testing Sharded Limiter ---")
+    sharded = ShardedRateLimiter(max_requests=2, window_seconds=10, num_shards=8)
+    print([sharded.check_and_hit("user_4", t) for t in (1, 2, 3, 12)])  # [True, True, False, True]
+
+    print("\n--- Testing Batch check_and_hit_many ---")
+    sharded = ShardedRateLimiter(max_requests=2, window_seconds=10, num_shards=8)
+    batch = [("user_a", 1), ("user_b", 1), ("user_a", 2), ("user_a", 3), ("user_b", 12)]
+    print(sharded.check_and_hit_many(batch))  # [True, True, True, False, True]
+
+    print("\n--- Testing Metrics ---")
+    metrics = LimiterMetrics(top_k=2)
+    limiter = ShardedRateLimiter(max_requests=2, window_seconds=10, metrics=metrics)
+    for key in ["user_a"] * 5 + ["user_b"] * 3 + ["user_c"]:
+        limiter.check_and_hit(key, 1)
+    stats = metrics.to_dict()
+    print(f"allowed {stats['allowed']}, rejected {stats['rejected']}")  # allowed 5, rejected 4
+    print([(entry["key"], entry["requests"]) for entry in stats["top_keys"]])  # user_a 5, user_c 4 (took over user_b's counter)
+    print(metrics.to_prometheus().splitlines()[2])  # rate_limiter_decisions_total{result="allowed"} 5
+
+    print("\n--- Testing Idle Key Eviction ---")
+    limiter = ThreadSafeRateLimiter(max_requests=2, window_seconds=10)
+    for i in range(1000):
+        limiter.check_and_hit(f"user_{i}", i % 20)
+    limiter.check_and_hit("user_0", 25)
+    print(f"Evicted at t=30: {limiter.evict_expired(30)}")  # 999 (user_0 hit at t=25)
+    print(f"Stats: {limiter.eviction_stats()}")  # live_keys 1
+
+    print("\n--- Testing Async Limiter ---")
+
+    async def async_demo():
+        limiter = AsyncRateLimiter(max_requests=2, window_seconds=0.05)
+        print(f"check_and_hit: {[await limiter.check_and_hit('user_5') for _ in range(3)]}")  # [True, True, False]
+        order = []
+
+        async def client(i):
+            await limiter.acquire("user_5")
+            order.append(i)
+
+        await asyncio.gather(*(client(i) for i in range(5)))
+        print(f"acquire order: {order}")  # [0, 1, 2, 3, 4]
+
+    asyncio.run(async_demo())
+
+    print("\n--- Testing Shared-Memory Limiter Across Processes ---")
+    with SharedMemoryRateLimiter(max_requests=10, window_seconds=60, slots=64) as shared:
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_shared_memory_worker, args=(shared, "user_6", 10, results))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        allowed = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        print(f"Allowed per process: {sorted(allowed)}, total {sum(allowed)}")  # total 10, not 40
@@ -81,6 +81,7 @@ def find_cheapest_route(inputString, sourceCountry, targetCountry):
     return cheapest_route if cheapest_route else "No valid route found"
 
 import heapq
+import sys
 def dijkstra(inputString, sourceCountry, targetCountry):
     graph = parse_input(inputString)
     queue = [(0, sourceCountry, [], [])]  # (cost, current country, path, methods)
@@ -114,3 +115,78 @@ targetCountry = "CA"
 
 cheapest_route_info = dijkstra(inputString, sourceCountry, targetCountry)
 print(cheapest_route_info)
+
+# Follow-up: the same search over a compact graph.
+# parse_input keeps a dict of lists of (target, method, cost) tuples, over 100 bytes
+# per route, and dijkstra copies the whole path and method list on every push.
+# Plan:
+#   Build a CSRGraph (practice/src/csr_graph.py): interned country ids, an
+#   offsets array, and parallel target / method id / cost arrays.
+#   Dijkstra over node ids with a flat dist list and the edge that reached each node,
+#   then walk those edges back once to build the route and methods.
+# Performance:
+#   O(E log V) like before, but a push is a small tuple instead of two list copies,
+#   and the graph is ~24 bytes per route.
+from csr_graph import CSRGraph, split_records  # practice/src/csr_graph.py
+
+
+def parse_input_csr(inputString):
+    # One flat split per block and strided slices give the columns without a
+    # per-route split in Python.
+    blocks = ((source, target, method, map(int, cost))
+              for source, target, method, cost in split_records(inputString, 4))
+    return CSRGraph.from_column_chunks(blocks, [('method', None), ('cost', 'q')])
+
+
+def dijkstra_csr(graph, sourceCountry, targetCountry):
+    if isinstance(graph, str):
+        graph = parse_input_csr(graph)
+    if sourceCountry == targetCountry:
+        # Like dijkstra, staying put is a free route even for a country with no routes.
+        return {"route": sourceCountry, "method": "", "cost": 0}
+    if sourceCountry not in graph or targetCountry not in graph:
+        return "No valid route found"
+
+    offsets, targets, costs = graph.offsets, graph.targets, graph.columns['cost']
+    source, target = graph.index[sourceCountry], graph.index[targetCountry]
+    dist = [sys.maxsize] * len(graph)
+    parent = [-1] * len(graph)
+    via = [-1] * len(graph)  # edge position that reached each node, for its method
+    dist[source] = 0
+    queue = [(0, source)]
+
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if node == target:
+            break
+        if cost > dist[node]:
+            continue
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            new_cost = cost + costs[e]
+            if new_cost < dist[neighbor]:
+                dist[neighbor] = new_cost
+                parent[neighbor] = node
+                via[neighbor] = e
+                heapq.heappush(queue, (new_cost, neighbor))
+    else:
+        return "No valid route found"
+
+    route, methods = [targetCountry], []
+    node = target
+    while node != source:
+        methods.append(graph.label('method', via[node]))
+        node = parent[node]
+        route.append(graph.nodes[node])
+    return {
+        "route": " -> ".join(reversed(route)),
+        "method": " -> ".join(reversed(methods)),
+        "cost": dist[target]
+    }
+
+inputString = "US:UK:UPS:4,US:UK:DHL:5,UK:CA:FedEx:10,AU:JP:DHL:20,US:JP:DHL:50,JP:CA:DHL:15"
+print(dijkstra_csr(inputString, "US", "CA"))
+
+# Same answers as dijkstra, including unreachable pairs and a country with no routes.
+for source, target in [("US", "CA"), ("AU", "CA"), ("CA", "US"), ("US", "US"), ("FR", "FR"), ("FR", "US")]:
+    assert dijkstra_csr(inputString, source, target) == dijkstra(inputString, source, target), (source, target)